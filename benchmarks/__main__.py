@@ -0,0 +1,38 @@
+"""
+Micro-benchmarks of crest's hot paths. Run from repository root:
+
+    python -m benchmarks [NAME ...] [--save FILE] [--compare FILE]
+
+NAME selects benchmarks whose name starts with it. Results saved with --save can be given
+to --compare later to find benchmarks that became slower.
+"""
+
+from __future__ import print_function
+
+import sys
+from argparse import ArgumentParser
+
+import bodyparts, histories, output, roundtrip, services
+from harness import compare, load, run, save
+
+
+def main():
+    parser = ArgumentParser('python -m benchmarks', description=__doc__.strip().split('\n')[0])
+    parser.add_argument('names', nargs='*', metavar='NAME', help='Benchmark name prefix')
+    parser.add_argument('--min-time', type=float, default=0.2, dest='min_time',
+                        help='Minimum seconds of each timed run. Defaults to 0.2')
+    parser.add_argument('--save', metavar='FILE', help='Save results as JSON in FILE')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='Compare with results saved in FILE. Exits with 1 if any is slower')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Fraction by which a benchmark can be slower. Defaults to 0.25')
+    args = parser.parse_args()
+    results = run(args.names, args.min_time)
+    if args.save:
+        save(results, args.save)
+    if args.compare and compare(results, load(args.compare), args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
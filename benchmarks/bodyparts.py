@@ -0,0 +1,64 @@
+"""
+Benchmarks of JSON body part expressions used by -o and -r
+"""
+
+import copy
+
+from crest.bodypart import BodyPart
+from crest.cli import extract_body_part, parse_body_part, update_body_parts
+from crest.template import Template
+
+from harness import benchmark
+
+
+names = ['groupConfiguration.name', 'launchConfiguration.args.server.networks[0].uuid',
+         'scalingPolicies[2].args.cron', 'a.b[2].c[-1]', 'groups[*].id']
+
+aliases = {'name': 'groupConfiguration.name',
+           'image': 'launchConfiguration.args.server.imageRef',
+           'flavor': 'launchConfiguration.args.server.flavorRef'}
+
+body = {
+    'groupConfiguration': {'name': 'g', 'cooldown': 5, 'minEntities': 0, 'maxEntities': 25},
+    'launchConfiguration': {
+        'type': 'launch_server',
+        'args': {'server': {'flavorRef': 'performance1-1', 'name': 'webhead', 'imageRef': 'x',
+                            'networks': [{'uuid': '11111111-1111-1111-1111-111111111111'}]}}
+    },
+    'scalingPolicies': [{'name': 'p{}'.format(i), 'change': i, 'args': {'cron': '* * 3 * *'}}
+                        for i in range(5)]
+}
+
+
+@benchmark('bodypart.parse')
+def parse(tmp):
+    return lambda: [BodyPart(name) for name in names]
+
+
+@benchmark('bodypart.parse_cached')
+def parse_cached(tmp):
+    return lambda: [list(parse_body_part(name)) for name in names]
+
+
+@benchmark('bodypart.extract')
+def extract(tmp):
+    return lambda: extract_body_part(body, 'launchConfiguration.args.server.networks[0].uuid')
+
+
+@benchmark('bodypart.update_aliases')
+def update(tmp):
+    resource = {'aliases': aliases}
+    replacements = [('name', 'g2'), ('image', 'y'), ('flavor', '2'),
+                    ('scalingPolicies[*].change', '3')]
+
+    def run():
+        update_body_parts(resource, copy.deepcopy(body), replacements)
+    return run
+
+
+@benchmark('template.render_aliases')
+def render(tmp):
+    template = Template(body, aliases)
+    replacements = [('name', 'g2'), ('image', 'y'), ('flavor', '2'),
+                    ('scalingPolicies[*].change', '3')]
+    return lambda: template.render(replacements)
@@ -0,0 +1,100 @@
+"""
+Registry and runner of micro-benchmarks
+"""
+
+from __future__ import division, print_function
+
+import json
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+
+
+_benchmarks = OrderedDict()
+
+
+def benchmark(name):
+    """
+    Register decorated function as benchmark `name`. The function is given a temporary
+    directory and returns function whose calls are timed
+    """
+    def register(f):
+        _benchmarks[name] = f
+        return f
+    return register
+
+
+def time_calls(f, min_time=0.2, repeat=5):
+    """
+    Return seconds per call of `f` in each of `repeat` runs. Each run calls `f` as many
+    times as take at least `min_time` seconds
+    """
+    number = 1
+    while True:
+        start = time.time()
+        for _ in xrange(number):
+            f()
+        elapsed = time.time() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 10 < min_time else 1 + int(min_time / elapsed)
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.time()
+        for _ in xrange(number):
+            f()
+        times.append((time.time() - start) / number)
+    return times
+
+
+def run(names=None, min_time=0.2, out=None):
+    """
+    Run benchmarks whose name starts with any of `names` and return {name: best microseconds
+    per call}, printing each result as it completes
+    """
+    results = OrderedDict()
+    print('{:<36}{:>14}{:>14}'.format('benchmark', 'best(us)', 'median(us)'), file=out)
+    for name, setup in _benchmarks.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        tmp = tempfile.mkdtemp()
+        try:
+            times = sorted(time_calls(setup(tmp), min_time))
+        finally:
+            shutil.rmtree(tmp)
+        results[name] = times[0] * 1e6
+        print('{:<36}{:>14.2f}{:>14.2f}'.format(name, times[0] * 1e6,
+                                               times[len(times) // 2] * 1e6), file=out)
+    return results
+
+
+def compare(results, baseline, tolerance, out=None):
+    """
+    Print change of `results` against `baseline` results and return names of benchmarks
+    slower by more than `tolerance` fraction
+    """
+    slower = []
+    print('\n{:<36}{:>14}{:>14}{:>10}'.format('benchmark', 'baseline(us)', 'now(us)', 'change'),
+          file=out)
+    for name, now in results.items():
+        if name not in baseline:
+            continue
+        change = now / baseline[name] - 1
+        flag = ''
+        if change > tolerance:
+            slower.append(name)
+            flag = '  SLOWER'
+        print('{:<36}{:>14.2f}{:>14.2f}{:>+9.0f}%{}'.format(
+            name, baseline[name], now, change * 100, flag), file=out)
+    return slower
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=4)
@@ -0,0 +1,50 @@
+"""
+Benchmarks of history with 10k requests
+"""
+
+from itertools import islice
+
+from crest.history import History
+
+from harness import benchmark
+
+
+size = 10000
+
+body = '{"groupConfiguration": {"name": "g%d", "cooldown": 5}, "launchConfiguration": {}}'
+
+
+def filled(tmp):
+    history = History(tmp)
+    for i in xrange(size):
+        history.store_item('POST', 'groups/{}/policies'.format(i % 100), body % i)
+    return history
+
+
+@benchmark('history.store_item')
+def store_item(tmp):
+    history = filled(tmp)
+    state = {'i': 0}
+
+    def run():
+        state['i'] += 1
+        history.store_item('GET', 'groups/{}'.format(state['i']), None)
+    return run
+
+
+@benchmark('history.items_page')
+def items(tmp):
+    history = filled(tmp)
+    return lambda: list(islice(history.items(False), 100))
+
+
+@benchmark('history.getitem')
+def getitem(tmp):
+    history = filled(tmp)
+    return lambda: history[size // 2]
+
+
+@benchmark('history.search')
+def search(tmp):
+    history = filled(tmp)
+    return lambda: list(history.search('post', 'groups/5/policies', body='g5'))
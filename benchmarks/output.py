@@ -0,0 +1,29 @@
+"""
+Benchmarks of formatting response bodies
+"""
+
+import json
+
+from crest.cli import pretty
+
+from harness import benchmark
+
+
+def servers(count):
+    return {'servers': [{'id': 'server-{}'.format(i), 'name': 'webhead-{}'.format(i),
+                         'status': 'ACTIVE', 'flavor': {'id': 'performance1-1'},
+                         'addresses': {'private': [{'addr': '10.0.0.{}'.format(i % 256)}]},
+                         'metadata': {'mani': 'manitest'}}
+                        for i in range(count)]}
+
+
+@benchmark('pretty.text_1mb')
+def pretty_text(tmp):
+    text = json.dumps(servers(5000))
+    return lambda: pretty(text)
+
+
+@benchmark('pretty.object_1mb')
+def pretty_object(tmp):
+    body = servers(5000)
+    return lambda: pretty(body)
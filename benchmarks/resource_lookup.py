@@ -0,0 +1,48 @@
+"""
+Cost of finding resource config of a resource path versus number of resources in service config.
+
+Compares searching each pattern in turn (as crest did earlier) with `ResourceMatcher`
+without its cache of recent paths. Run from repository root:
+
+    python -m benchmarks.resource_lookup
+"""
+
+from __future__ import print_function
+
+import re
+import timeit
+
+from crest.matcher import ResourceMatcher
+
+
+def resources(count):
+    """
+    OpenAPI like resources: collections and items of `count` / 2 names
+    """
+    config = {}
+    for i in range(count // 2):
+        config['res{}/?$'.format(i)] = {'help': 'collection {}'.format(i)}
+        config['res{}/[\\w\\-]+/?$'.format(i)] = {'help': 'item {}'.format(i)}
+    return config
+
+
+def sequential(config, res):
+    for config_re, resource in config.items():
+        if re.search(config_re, res, re.IGNORECASE):
+            return resource
+
+
+def main(number=200):
+    print('{:>10}{:>16}{:>16}'.format('resources', 'sequential(us)', 'matcher(us)'))
+    for count in (10, 50, 100, 500, 1000):
+        config = resources(count)
+        matcher = ResourceMatcher(config.items())
+        paths = ['v1/res{}/item-{}'.format(i % (count // 2), i) for i in range(number)]
+        seq = timeit.timeit(lambda: [sequential(config, path) for path in paths], number=1)
+        matched = timeit.timeit(lambda: [matcher._match(path) for path in paths], number=1)
+        print('{:>10}{:>16.1f}{:>16.1f}'.format(
+            count, seq * 1e6 / number, matched * 1e6 / number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmarks of whole requests sent by crest to a local stand-in HTTP server
+"""
+
+import json
+import os
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+from crest import cli
+
+from harness import benchmark
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Responds to /items/N with JSON of N items
+    """
+    protocol_version = 'HTTP/1.1'
+    # Writes are buffered and sent without waiting for ACK of earlier segments so that
+    # delayed ACK of client does not add latency
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    bodies = {}
+
+    def do_GET(self):
+        count = int(self.path.rsplit('/', 1)[-1])
+        if count not in self.bodies:
+            self.bodies[count] = json.dumps(
+                {'items': [{'id': i, 'name': 'item-{}'.format(i), 'tags': ['a', 'b']}
+                           for i in range(count)]})
+        body = self.bodies[count]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+_server = None
+
+
+def server_uri():
+    """
+    URI of stand-in server started on first call
+    """
+    global _server
+    if _server is None:
+        _server = Server(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=_server.serve_forever)
+        thread.daemon = True
+        thread.start()
+    return 'http://127.0.0.1:{}'.format(_server.server_port)
+
+
+def execute(argv):
+    import requests
+
+    def setup(tmp):
+        cli.home = tmp
+        os.makedirs(os.path.join(tmp, 'generic_history'))
+        parser = cli.setup_parser()
+        args = parser.parse_args([server_uri() + argv[0]] + argv[1:])
+        session = requests.Session()
+        out = open(os.devnull, 'w')
+        return lambda: cli.execute(args, session, out)
+    return setup
+
+
+benchmark('request.small')(execute(['/items/10']))
+benchmark('request.output_part')(execute(['/items/1000', '-o', 'items[-1].name']))
+benchmark('request.large_stream')(execute(['/items/20000', '-o', 'items[*].id']))
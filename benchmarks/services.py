@@ -0,0 +1,54 @@
+"""
+Benchmarks of loading a service and finding resource config of large resource maps
+"""
+
+import os
+
+from crest import cli
+
+from harness import benchmark
+
+
+def write_config(home, count):
+    """
+    Install service "svc" at `home` having `count` resources: collections and items
+    """
+    os.makedirs(os.path.join(home, 'svc', 'history'))
+    resources = {}
+    for i in range(count // 2):
+        resources['res{}/?$'.format(i)] = {'help': 'collection {}'.format(i)}
+        resources['res{}/[\\w\\-]+/?$'.format(i)] = {'help': 'item {}'.format(i)}
+    with open(os.path.join(home, 'svc', 'config.py'), 'w') as f:
+        f.write('config = {!r}\n'.format({'name': 'svc', 'uriprefix': 'http://h',
+                                           'resources': resources}))
+
+
+def lookup(count):
+    """
+    Benchmark of finding resource config of 50 paths in map of `count` resources
+    """
+    def setup(tmp):
+        write_config(tmp, count)
+        cli.home = tmp
+        service = cli.Service('svc')
+        # Paths of resources spread over the map
+        paths = ['res{}/item-{}'.format(i * count // 100, i) for i in range(50)]
+
+        def run():
+            for path in paths:
+                service.get_resource(path)
+            # So that matcher's cache of recent paths does not help
+            service._matcher._cache.clear()
+        return run
+    return setup
+
+
+for _count in (100, 1000):
+    benchmark('service.get_resource_{}'.format(_count))(lookup(_count))
+
+
+@benchmark('service.load_1000')
+def load(tmp):
+    write_config(tmp, 1000)
+    cli.home = tmp
+    return lambda: cli.Service('svc')
@@ -89,12 +89,22 @@ config = {
         "content-type": "application/json",
         "X-Auth-Token": {"env": "RS_AUTH_TOKEN"}
     },
+    "auth": {
+        "service": "raxid",
+        "resource": "tokens",
+        "template": "default",
+        "replace": {"username": {"env": "RS_USERNAME"}, "password": {"env": "RS_PASSWORD"}},
+        "token": "access.token.id",
+        "expires": "access.token.expires",
+        "header": "X-Auth-Token"
+    },
     "resources": {
         "groups/?$": {
             "templates": {"default": group},
             "aliases": {
                 "name": "groupConfiguration.name"
             },
+            "pagination": {"next": "groups_links[?rel=next].href", "items": "groups"},
             "help": "Scaling groups. Ex: groups"
         },
         "groups/[\w\-]+/?$": {
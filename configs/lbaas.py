@@ -43,6 +43,15 @@ config = {
         "X-Auth-Token": {"env": "RS_AUTH_TOKEN"},
         "Content-Type": "application/json"
     },
+    "auth": {
+        "service": "raxid",
+        "resource": "tokens",
+        "template": "default",
+        "replace": {"username": {"env": "RS_USERNAME"}, "password": {"env": "RS_PASSWORD"}},
+        "token": "access.token.id",
+        "expires": "access.token.expires",
+        "header": "X-Auth-Token"
+    },
     "tempfile": "/tmp/lb_req.json",
     "resources": {
         "loadbalancers/?$": {
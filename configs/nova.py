@@ -24,12 +24,22 @@ config = {
         "X-Auth-Token": {"env": "RS_AUTH_TOKEN"},
         "content-type": "application/json"
     },
+    "auth": {
+        "service": "raxid",
+        "resource": "tokens",
+        "template": "default",
+        "replace": {"username": {"env": "RS_USERNAME"}, "password": {"env": "RS_PASSWORD"}},
+        "token": "access.token.id",
+        "expires": "access.token.expires",
+        "header": "X-Auth-Token"
+    },
     "resources": {
         "servers/?$": {
             "templates": {"default": server},
             "aliases": {
                 "name": "server.name"
             },
+            "pagination": {"next": "servers_links[?rel=next].href", "items": "servers"},
             "help": "Servers"
         },
         "os-keypairs/?$": {
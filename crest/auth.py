@@ -0,0 +1,137 @@
+"""
+Tokens of services that authenticate via another installed service.
+
+A service config declares how its token is acquired with "auth"::
+
+    "auth": {
+        "service": "raxid",
+        "resource": "tokens",
+        "method": "post",
+        "template": "default",
+        "replace": {"username": {"env": "RS_USERNAME"}, "password": {"env": "RS_PASSWORD"}},
+        "token": "access.token.id",
+        "expires": "access.token.expires",
+        "header": "X-Auth-Token"
+    }
+
+"token" and "expires" are body parts of auth response like -o. Token is kept in memory and in
+service's directory so that it is acquired again only when it expires or is rejected with 401.
+"""
+
+import calendar
+import json
+import os
+import re
+import threading
+import time
+
+from bodypart import compile_body_part
+
+
+_offset_re = re.compile(r'([+-])(\d\d):?(\d\d)$')
+
+
+def parse_expiry(value):
+    """
+    Epoch time of `value` given as epoch number or ISO 8601 time in UTC or with offset
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    expires = calendar.timegm(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S'))
+    match = _offset_re.search(value[19:])
+    if match:
+        sign, hours, minutes = match.groups()
+        expires -= (1 if sign == '+' else -1) * (int(hours) * 3600 + int(minutes) * 60)
+    return expires
+
+
+def acquire_token(service, auth, session):
+    """
+    Send auth request described by `auth` config to `service` and return
+    (token, epoch time it expires at or None)
+    """
+    resource = auth['resource']
+    body = None
+    if auth.get('template'):
+        body = service.get_template_body(resource, auth['template'])
+        aliases = (service.get_resource(resource) or {}).get('aliases')
+        for name, value in auth.get('replace', {}).items():
+            if isinstance(value, dict):
+                env = value['env']
+                value = os.getenv(env)
+                if value is None:
+                    raise SystemExit('Error: ${} not set to authenticate'.format(env))
+            compile_body_part(name, aliases).set(body, value)
+        body = json.dumps(body)
+    try:
+        uriprefix = service.uri_prefix()
+    except KeyError:
+        uriprefix = None
+    if not uriprefix:
+        raise SystemExit('Error: URI prefix of auth service {} not set'.format(auth['service']))
+    uri = uriprefix.rstrip('/') + '/' + resource
+    r = session.request(auth.get('method', 'post'), uri, data=body, headers=service.headers)
+    if r.status_code not in (200, 201, 202, 203):
+        raise SystemExit('Error: Authentication with {} returned {}'.format(uri, r.status_code))
+    try:
+        content = r.json()
+        token = compile_body_part(auth['token']).get(content)
+        expires = None
+        if auth.get('expires'):
+            expires = parse_expiry(compile_body_part(auth['expires']).get(content))
+        elif auth.get('ttl'):
+            expires = time.time() + auth['ttl']
+    except (ValueError, LookupError, TypeError) as e:
+        raise SystemExit('Error: Invalid authentication response from {} - {}: {}'.format(
+            uri, type(e).__name__, e))
+    return token, expires
+
+
+class Token(object):
+    """
+    Cached token of a service stored in `path`. It is considered expired `margin` seconds
+    before its expiry so that requests sent with it do not race with the expiry
+    """
+
+    file_name = '.token'
+    margin = 60
+
+    def __init__(self, path):
+        self.path = os.path.join(path, self.file_name)
+        self.value = None
+        self.expires = None
+        self._lock = threading.Lock()
+
+    def _valid(self):
+        return self.value is not None and (
+            self.expires is None or time.time() < self.expires - self.margin)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            self.value, self.expires = cached['token'], cached['expires']
+        except (IOError, ValueError, KeyError):
+            self.value = self.expires = None
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'token': self.value, 'expires': self.expires}, f)
+        os.rename(tmp_path, self.path)
+
+    def get(self, acquire, stale=None):
+        """
+        Return cached token if it is valid and is not `stale` (rejected by service).
+        Otherwise return token got by calling `acquire` which returns (token, expires)
+        """
+        with self._lock:
+            if not self._valid() or self.value == stale:
+                # Another process may have acquired it
+                self._load()
+            if self._valid() and self.value != stale:
+                return self.value
+            self.value, self.expires = acquire()
+            self._save()
+            return self.value
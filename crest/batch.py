@@ -0,0 +1,92 @@
+"""
+Send many requests from one process over shared keep-alive connections
+"""
+
+from __future__ import print_function
+
+import sys
+from StringIO import StringIO
+
+import requests
+
+from cli import print_response
+from engine import close_pool, make_pool, run_request
+
+
+def run_line(parser, session, line, pool_size=None, rate_limit=None):
+    """
+    Send request described by crest arguments in `line` using `session`. `pool_size` and
+    `rate_limit` apply unless given in `line`.
+    Returns `Result` whose value is compact response. It is one line even with --ndjson
+    """
+    buf = StringIO()
+
+    def handle(r, args):
+        print_response(r, args.output, buf, fmt='compact')
+
+    result = run_request(line, session, handle, parser,
+                         {'pool_size': pool_size, 'rate_limit': rate_limit}, buf)
+    return result._replace(value=buf.getvalue().rstrip('\n'))
+
+
+def requests_lines(lines):
+    """
+    Numbered lines skipping blank lines and lines starting with #
+    """
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield lineno, line
+
+
+def print_result(lineno, result, report, out, err):
+    output = '' if result.error else result.value
+    if report:
+        print(lineno, result.status or '-', '{:.1f}'.format(result.latency * 1000),
+              output, sep='\t', file=out)
+    else:
+        print(output, file=out)
+    if result.error:
+        print('{}: {}'.format(lineno, result.error), file=err)
+    out.flush()
+
+
+def run_batch(parser, lines, pool_size=None, concurrency=1, as_completed=False, report=False,
+              session=None, out=sys.stdout, err=sys.stderr, rate_limit=None):
+    """
+    Send request for each line of crest arguments in `lines` over one session (`session` if
+    given). Blank lines and lines starting with # are skipped. Every request prints exactly one
+    line on `out` as soon as it can: its compact output or empty line on error.
+    Errors are printed on `err` prefixed with line number and do not stop other requests.
+
+    Upto `concurrency` requests are in flight at a time. Results are printed in order of
+    `lines` unless `as_completed` is given. With `report` (implied by `as_completed`), each
+    line is prefixed by tab separated line number, status code and latency in milliseconds.
+    `rate_limit` is the most requests sent per second.
+    Returns number of failed requests
+    """
+    if concurrency > (pool_size or requests.adapters.DEFAULT_POOLSIZE):
+        pool_size = concurrency
+    session = session or requests.Session()
+
+    def run(numbered_line):
+        lineno, line = numbered_line
+        return lineno, run_line(parser, session, line, pool_size, rate_limit)
+
+    if concurrency > 1:
+        pool = make_pool(concurrency)
+        imap = pool.imap_unordered if as_completed else pool.imap
+        results = imap(run, requests_lines(lines))
+    else:
+        pool = None
+        results = (run(numbered_line) for numbered_line in requests_lines(lines))
+
+    failures = 0
+    try:
+        for lineno, result in results:
+            failures += result.error is not None
+            print_result(lineno, result, report or as_completed, out, err)
+    finally:
+        if pool:
+            close_pool(pool)
+    return failures
@@ -0,0 +1,170 @@
+"""
+Send a request repeatedly at fixed concurrency or fixed rate for a duration and report
+throughput, latency percentiles, statuses, errors and bytes transferred.
+"""
+
+from __future__ import division, print_function
+
+import itertools
+import threading
+import time
+from collections import defaultdict
+
+
+class Histogram(object):
+    """
+    Counts of integer values in buckets whose width is at most 1/64 of the values in them,
+    like HdrHistogram with 2 significant digits. Memory used does not grow with the number
+    of values recorded
+    """
+
+    sub_bucket_bits = 7
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        shift = max(value.bit_length() - self.sub_bucket_bits, 0)
+        self.counts[(shift, value >> shift)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent):
+        """
+        Highest value in bucket of value at `percent` percentile
+        """
+        if not self.count:
+            return None
+        target = max(int(round(self.count * percent / 100)), 1)
+        seen = 0
+        for shift, sub_bucket in sorted(self.counts):
+            seen += self.counts[(shift, sub_bucket)]
+            if seen >= target:
+                return min(((sub_bucket + 1) << shift) - 1, self.max)
+        return self.max
+
+
+def _ms(us):
+    return None if us is None else us / 1000
+
+
+def _format(value):
+    return '-' if value is None else '{:.2f}'.format(value)
+
+
+class Result(object):
+    """
+    Measurements of a benchmark. Latencies are recorded in microseconds
+    """
+
+    percentiles = (50, 90, 99, 99.9)
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.sent = 0
+        self.received = 0
+        self.elapsed = 0
+        self._lock = threading.Lock()
+
+    def add(self, latency, status=None, sent=0, received=0, error=None):
+        with self._lock:
+            self.latency.record(int(latency * 1000000))
+            if error:
+                self.errors[error] += 1
+            else:
+                self.statuses[status] += 1
+            self.sent += sent
+            self.received += received
+
+    def as_dict(self):
+        requests = self.latency.count
+        return {
+            'requests': requests,
+            'elapsed': self.elapsed,
+            'throughput': requests / self.elapsed if self.elapsed else 0,
+            'latency_ms': dict(
+                [('min', _ms(self.latency.min)), ('max', _ms(self.latency.max)),
+                 ('mean', _ms(self.latency.total / requests) if requests else None)] +
+                [('p{:g}'.format(p), _ms(self.latency.percentile(p))) for p in self.percentiles]),
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'errors': dict(self.errors),
+            'bytes_sent': self.sent,
+            'bytes_received': self.received
+        }
+
+    def printable(self):
+        d = self.as_dict()
+        latency = d['latency_ms']
+        lines = [
+            'Requests      {} in {:.2f}s ({:.1f}/s)'.format(d['requests'], d['elapsed'],
+                                                          d['throughput']),
+            'Latency (ms)  ' + '  '.join(
+                '{} {}'.format(name, _format(latency[name]))
+                for name in ['min', 'mean'] + ['p{:g}'.format(p) for p in self.percentiles] +
+                ['max']),
+            'Statuses      ' + '  '.join('{}: {}'.format(status, count)
+                                         for status, count in sorted(d['statuses'].items())),
+            'Bytes         received {} ({:.0f}/s)  sent {}'.format(
+                d['bytes_received'], d['bytes_received'] / d['elapsed'] if d['elapsed'] else 0,
+                d['bytes_sent'])
+        ]
+        if d['errors']:
+            lines.insert(3, 'Errors        ' + '  '.join(
+                '{}: {}'.format(error, count) for error, count in sorted(d['errors'].items())))
+        return '\n'.join(lines)
+
+
+def bench(send, duration, concurrency=1, rate=None, clock=time.time, sleep=time.sleep):
+    """
+    Call `send` from `concurrency` threads for `duration` seconds and return `Result`.
+    `send` returns (status, bytes sent, bytes received). With `rate`, calls are started
+    `rate` times per second and latency is measured from when a call should have started
+    so that delays due to slow responses are not hidden. Exceptions raised by `send` are
+    counted as errors by their type except SystemExit which stops the benchmark
+    """
+    result = Result()
+    start = clock()
+    deadline = start + duration
+    tickets = itertools.count()
+    lock = threading.Lock()
+    fatal = []
+
+    def worker():
+        while not fatal:
+            with lock:
+                ticket = next(tickets)
+            scheduled = start + ticket / rate if rate else clock()
+            if scheduled >= deadline:
+                return
+            if rate:
+                sleep(max(scheduled - clock(), 0))
+            try:
+                status, sent, received = send()
+            except SystemExit as e:
+                fatal.append(e)
+                return
+            except Exception as e:
+                result.add(clock() - scheduled, error=type(e).__name__)
+            else:
+                result.add(clock() - scheduled, status, sent, received)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        # Joining with timeout keeps main thread interruptible
+        while thread.is_alive():
+            thread.join(1)
+    if fatal:
+        raise fatal[0]
+    result.elapsed = clock() - start
+    return result
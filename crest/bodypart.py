@@ -0,0 +1,155 @@
+"""
+Compiled JSON body part expressions like ``a.b[2].c`` used by -o and -r options.
+
+Besides object keys and array indexes, a part can select many array elements using
+``[*]``, python-like slices ``[1:3]``, ``[-1]`` or filters ``[?key=value]`` selecting
+objects whose key has the value. For example, ``groups[*].id`` selects id of every group and
+``links[?rel=next].href`` selects href of link whose rel is "next".
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+
+_token_re = re.compile(r'\[(-?\d+|\*|-?\d*:-?\d*)\]|\[\?(\w+)=([^\]]*)\]|(\w+)')
+
+
+class Filter(namedtuple('Filter', 'key value')):
+    """
+    Selects array elements that are objects whose `key` is `value`
+    """
+
+    def matches(self, element):
+        return isinstance(element, dict) and element.get(self.key) == self.value
+
+
+def _parse(name):
+    parts = []
+    for match in _token_re.finditer(name):
+        index, filter_key, filter_value, key = match.groups()
+        if filter_key is not None:
+            try:
+                filter_value = json.loads(filter_value)
+            except ValueError:
+                pass
+            parts.append(Filter(filter_key, filter_value))
+        elif key is not None:
+            parts.append(int(key) if key.isdigit() else key)
+        elif index == '*':
+            parts.append(slice(None))
+        elif ':' in index:
+            start, stop = index.split(':')
+            parts.append(slice(int(start) if start else None, int(stop) if stop else None))
+        else:
+            parts.append(int(index))
+    return tuple(parts)
+
+
+def _containers(body, parts):
+    """
+    Generate (container, key) for every value selected by `parts` in `body`
+    """
+    if not parts:
+        return
+    part, rest = parts[0], parts[1:]
+    if isinstance(part, slice):
+        keys = xrange(*part.indices(len(body)))
+    elif isinstance(part, Filter):
+        keys = [index for index, element in enumerate(body) if part.matches(element)]
+    else:
+        keys = (part,)
+    for key in keys:
+        if rest:
+            for container in _containers(body[key], rest):
+                yield container
+        else:
+            yield body, key
+
+
+def select(body, parts):
+    """
+    Generate all values selected by parsed `parts` in `body`
+    """
+    if not parts:
+        yield body
+    for container, key in _containers(body, parts):
+        yield container[key]
+
+
+class BodyPart(object):
+    """
+    Parsed body part that can get or set its value(s) in a JSON body. Parts with wildcards,
+    slices or filters select many values: `get` returns list of them and `set` updates all of them
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.parts = _parse(name)
+        self.many = any(isinstance(part, (slice, Filter)) for part in self.parts)
+
+    def __repr__(self):
+        return 'BodyPart({!r})'.format(self.name)
+
+    def parent(self, body):
+        """
+        Return (container, key) of single value selected in `body`
+        """
+        if self.many:
+            raise ValueError('{} selects many values'.format(self.name))
+        for part in self.parts[:-1]:
+            body = body[part]
+        return body, self.parts[-1]
+
+    def values(self, body):
+        """
+        Generate all values selected in `body` in single traversal
+        """
+        return select(body, self.parts)
+
+    def get(self, body):
+        if self.many:
+            return list(self.values(body))
+        for part in self.parts:
+            body = body[part]
+        return body
+
+    def set(self, body, value):
+        if self.many:
+            for container, key in list(_containers(body, self.parts)):
+                container[key] = value
+        else:
+            container, key = self.parent(body)
+            container[key] = value
+
+
+class _LRU(object):
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, create):
+        with self.lock:
+            try:
+                value = self.items.pop(key)
+            except KeyError:
+                value = create(key)
+                if len(self.items) >= self.size:
+                    self.items.popitem(last=False)
+            self.items[key] = value
+            return value
+
+
+_compiled = _LRU(1024)
+
+
+def compile_body_part(name, aliases=None):
+    """
+    Return `BodyPart` of `name` or its alias in `aliases`. It is parsed once and cached
+    """
+    if aliases:
+        name = aliases.get(name, name)
+    return _compiled.get(name, BodyPart)
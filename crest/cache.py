@@ -0,0 +1,279 @@
+"""
+Opt-in cache of GET responses stored in ~/.crest/.cache.db SQLite database.
+
+A response is fresh for max-age of its Cache-Control or till its Expires header, or for
+"cache_ttl" seconds given in resource or service config. A stale response having ETag or
+Last-Modified is revalidated with If-None-Match or If-Modified-Since so that its body is not
+sent again if it has not changed. Responses are stored per method, URI and values of request
+headers named in their Vary. Least recently used responses are evicted when total size of
+stored bodies exceeds `max_size`.
+"""
+
+import json
+import threading
+import time
+import zlib
+from email.utils import mktime_tz, parsedate_tz
+
+
+def cache_control(headers):
+    """
+    Directives in Cache-Control header as dict
+    """
+    directives = {}
+    for directive in headers.get('cache-control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def http_date(value):
+    parsed = value and parsedate_tz(value)
+    return mktime_tz(parsed) if parsed else None
+
+
+def lifetime(headers, ttl=None):
+    """
+    Seconds a response with `headers` is fresh for from now or None if it must not be stored.
+    `ttl` overrides the headers
+    """
+    directives = cache_control(headers)
+    if 'no-store' in directives or headers.get('vary') == '*':
+        return None
+    if ttl is not None:
+        return ttl
+    if 'no-cache' in directives:
+        return 0
+    if 'max-age' in directives:
+        try:
+            return max(int(directives['max-age']) - int(headers.get('age', 0)), 0)
+        except ValueError:
+            return 0
+    expires = http_date(headers.get('expires'))
+    if expires is not None:
+        return max(expires - (http_date(headers.get('date')) or time.time()), 0)
+    return 0
+
+
+class Entry(object):
+    """
+    Stored response
+    """
+
+    def __init__(self, _id, uri, status, headers, body, expires):
+        self.id = _id
+        self.uri = uri
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+
+    def fresh(self):
+        return time.time() < self.expires
+
+    def validators(self):
+        """
+        Conditional request headers to revalidate this response
+        """
+        validators = {}
+        for header, validator in (('etag', 'If-None-Match'),
+                                  ('last-modified', 'If-Modified-Since')):
+            if header in self.headers:
+                validators[validator] = self.headers[header]
+        return validators
+
+    def response(self):
+        """
+        `requests.Response` of this entry
+        """
+        import datetime
+        from requests.models import Response
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+        r = Response()
+        r.status_code = self.status
+        r.headers = CaseInsensitiveDict(self.headers)
+        r.encoding = get_encoding_from_headers(r.headers)
+        r.url = self.uri
+        r._content = self.body
+        r._content_consumed = True
+        r.elapsed = datetime.timedelta(0)
+        return r
+
+
+class Cache(object):
+    """
+    Response cache stored at `path`
+    """
+    # Serializes access from concurrent requests
+    _lock = threading.Lock()
+
+    max_size = 64 * 1024 * 1024
+    # Larger responses are not stored
+    max_entry_size = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            import sqlite3
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.text_factory = str
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            with db:
+                db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                           'id INTEGER PRIMARY KEY, method TEXT NOT NULL, uri TEXT NOT NULL, '
+                           'vary TEXT, status INTEGER, headers TEXT, body BLOB, '
+                           'size INTEGER, expires REAL, accessed REAL)')
+                db.execute('CREATE INDEX IF NOT EXISTS responses_uri ON responses (uri)')
+                db.execute('CREATE INDEX IF NOT EXISTS responses_accessed '
+                           'ON responses (accessed)')
+                db.execute('CREATE TABLE IF NOT EXISTS stats ('
+                           'name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            self._db = db
+        return self._db
+
+    def lookup(self, method, uri, headers):
+        """
+        Return `Entry` stored for request or None
+        """
+        with self._lock:
+            db = self._conn()
+            rows = db.execute('SELECT id, vary, status, headers, body, expires FROM responses '
+                              'WHERE uri = ? AND method = ?', (uri, method)).fetchall()
+            for _id, vary, status, stored_headers, body, expires in rows:
+                if all(headers.get(name) == value for name, value in json.loads(vary).items()):
+                    with db:
+                        db.execute('UPDATE responses SET accessed = ? WHERE id = ?',
+                                   (time.time(), _id))
+                    return Entry(_id, uri, status, json.loads(stored_headers),
+                                 zlib.decompress(body), expires)
+
+    def store(self, method, uri, headers, r, ttl=None):
+        """
+        Store response `r` of request if it can be. Returns response to use in place of `r`
+        """
+        seconds = lifetime(r.headers, ttl)
+        length = r.headers.get('content-length')
+        if (r.status_code != 200 or seconds is None or length is None or
+                int(length) > self.max_entry_size):
+            return r
+        if not seconds and 'etag' not in r.headers and 'last-modified' not in r.headers:
+            return r
+        content = r.content
+        # Body is stored decoded
+        stored_headers = {name.lower(): value for name, value in r.headers.items()
+                          if name.lower() not in ('content-encoding', 'transfer-encoding')}
+        stored_headers['content-length'] = str(len(content))
+        body = zlib.compress(content)
+        vary = {}
+        for name in r.headers.get('vary', '').split(','):
+            name = name.strip().lower()
+            if name:
+                vary[name] = headers.get(name)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            with db:
+                for _id, stored_vary in db.execute(
+                        'SELECT id, vary FROM responses WHERE uri = ? AND method = ?',
+                        (uri, method)).fetchall():
+                    if json.loads(stored_vary) == vary:
+                        db.execute('DELETE FROM responses WHERE id = ?', (_id,))
+                db.execute('INSERT INTO responses (method, uri, vary, status, headers, body, '
+                           'size, expires, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                           (method, uri, json.dumps(vary), r.status_code,
+                            json.dumps(stored_headers), buffer(body), len(body),
+                            now + seconds, now))
+                self._evict(db)
+        return r
+
+    def _evict(self, db):
+        size = db.execute('SELECT coalesce(sum(size), 0) FROM responses').fetchone()[0]
+        for _id, entry_size in db.execute(
+                'SELECT id, size FROM responses ORDER BY accessed').fetchall():
+            if size <= self.max_size:
+                break
+            db.execute('DELETE FROM responses WHERE id = ?', (_id,))
+            size -= entry_size
+
+    def refresh(self, entry, r, ttl=None):
+        """
+        Update freshness of `entry` from 304 response `r` revalidating it
+        """
+        entry.headers.update((name.lower(), value) for name, value in r.headers.items()
+                             if name.lower() in ('cache-control', 'expires', 'date', 'etag',
+                                                 'last-modified'))
+        seconds = lifetime(entry.headers, ttl)
+        with self._lock:
+            db = self._conn()
+            with db:
+                db.execute('UPDATE responses SET headers = ?, expires = ? WHERE id = ?',
+                           (json.dumps(entry.headers), time.time() + (seconds or 0), entry.id))
+
+    def invalidate(self, uri):
+        """
+        Remove responses of `uri` changed by a request
+        """
+        with self._lock:
+            db = self._conn()
+            with db:
+                db.execute('DELETE FROM responses WHERE uri = ?', (uri,))
+
+    def count(self, name, saved=0):
+        """
+        Count a hit, revalidation or miss that saved `saved` bytes from being received
+        """
+        with self._lock:
+            db = self._conn()
+            with db:
+                for name, value in ((name, 1), ('bytes saved', saved)):
+                    db.execute('INSERT OR IGNORE INTO stats (name, value) VALUES (?, 0)', (name,))
+                    db.execute('UPDATE stats SET value = value + ? WHERE name = ?', (value, name))
+
+    def stats(self):
+        """
+        Return [(name, value)] of hits, revalidations, misses, bytes saved and stored responses
+        """
+        with self._lock:
+            db = self._conn()
+            counts = dict(db.execute('SELECT name, value FROM stats').fetchall())
+            entries, size = db.execute(
+                'SELECT count(*), coalesce(sum(size), 0) FROM responses').fetchone()
+        return [(name, counts.get(name, 0))
+                for name in ('hits', 'revalidations', 'misses', 'bytes saved')] + \
+            [('responses', entries), ('size', size)]
+
+    def request(self, session, method, uri, headers, ttl=None, **kwargs):
+        """
+        Send request with `session` unless a fresh response is stored. Returns response
+        """
+        if method.upper() != 'GET':
+            r = session.request(method, uri, headers=headers, **kwargs)
+            if r.status_code < 400:
+                self.invalidate(uri)
+            return r
+        entry = self.lookup('GET', uri, headers)
+        if entry and entry.fresh():
+            from requests import Request
+            self.count('hits', len(entry.body))
+            cached = entry.response()
+            cached.request = Request('GET', uri, headers=headers).prepare()
+            return cached
+        request_headers = headers
+        if entry:
+            request_headers = headers.copy()
+            request_headers.update(entry.validators())
+        r = session.request(method, uri, headers=request_headers, **kwargs)
+        if entry and r.status_code == 304:
+            self.refresh(entry, r, ttl)
+            self.count('revalidations', len(entry.body))
+            cached = entry.response()
+            cached.request, cached.elapsed = r.request, r.elapsed
+            return cached
+        self.count('misses')
+        return self.store('GET', uri, headers, r, ttl)
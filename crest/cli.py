@@ -2,32 +2,45 @@
 
 from __future__ import print_function
 
+import copy
 import sys, os
-from argparse import ArgumentParser
-import importlib
+from argparse import ArgumentParser, ArgumentTypeError
 import re
 import json
-import tempfile
-import subprocess
+from itertools import islice
 from operator import add
-import shutil
+import threading
+import time
 
-import requests
-from requests.structures import CaseInsensitiveDict
+# requests and modules needed only by some options are imported where they are used
+# to keep startup fast
 
+from auth import Token, acquire_token
+from bodypart import compile_body_part
 from history import History, HistoryItem
+import jsonlib
+from matcher import ResourceMatcher
+from registry import extract_config_from_file, find_resource, load_registry
+from stream import stream_body_part
+from timing import count, phase
 
 
 success_codes = [200, 201, 202, 203, 204]
 
+# Responses larger than this are streamed when only part of them is printed
+stream_threshold = 1024 * 1024
+stream_chunk_size = 64 * 1024
+
 
 home = os.path.expanduser('~/.crest')
 
 
-def extract_config_from_file(fname):
-    g = {}
-    execfile(fname, g)
-    return g['config']
+_services = {}
+_services_lock = threading.Lock()
+
+_cache = None
+_generators = None
+_limiters = {}
 
 
 class Service(object):
@@ -38,9 +51,13 @@ class Service(object):
         self.path = os.path.join(home, name)
         self.config = extract_config_from_file(os.path.join(self.path, 'config.py'))
         self.history = History(os.path.join(self.path, 'history'))
+        self.token = Token(self.path) if 'auth' in self.config else None
+        self._matcher = None
+        self._templates = {}
 
     @property
     def headers(self):
+        from requests.structures import CaseInsensitiveDict
         headers = CaseInsensitiveDict()
         for name, value in self.config.get('headers', {}).items():
             if isinstance(value, dict):
@@ -50,97 +67,571 @@ class Service(object):
         return headers
 
     def get_template_body(self, res, name):
+        """
+        Copy of template `name` of resource `res` that can be updated
+        """
+        res = self.get_resource(res)
+        return copy.deepcopy(res['templates'].get(name))
+
+    def get_template(self, res, name):
+        """
+        Compiled `Template` of template `name` of resource `res`. Compiled once per service
+        """
+        from template import Template
         res = self.get_resource(res)
-        return res['templates'].get(name)
+        key = (id(res), name)
+        template = self._templates.get(key)
+        if template is None and name in res['templates']:
+            template = self._templates[key] = Template(
+                res['templates'][name], res.get('aliases'), get_generators())
+        return template
 
     def get_template_names(self, res):
         return self.get_resource(res)['templates'].keys()
 
     def get_resource(self, res):
-        for config_re, resource in self.config['resources'].items():
-            if re.search(config_re, res, re.IGNORECASE):
-                return resource
+        if self._matcher is None:
+            self._matcher = ResourceMatcher(self.config['resources'].items())
+        return self._matcher.match(res)
 
     def uri_prefix(self):
-        value = self.config['uriprefix']
-        return os.getenv(value['env']) if isinstance(value, dict) else value
+        return config_value(self.config['uriprefix'])
+
+    def endpoints(self):
+        """
+        URI prefix of each endpoint in "endpoints" config
+        """
+        return {name: config_value(value)
+                for name, value in self.config.get('endpoints', {}).items()}
+
+
+def config_value(value):
+    """
+    Config value or environment variable named by its "env" if it is a dict
+    """
+    return os.getenv(value['env']) if isinstance(value, dict) else value
 
 
 def parse_headers(headers):
     return {name: value for name, value in map(lambda s: s.split(':'), headers)}
 
 
-def execute(args):
+def get_service(name):
     """
-    Execute with given args
+    Get service by name. Services are loaded once per process and reloaded if their
+    config changes
     """
+    mtime = os.path.getmtime(os.path.join(home, name, 'config.py'))
+    with _services_lock:
+        if name not in _services or _services[name][0] != mtime:
+            _services[name] = (mtime, Service(name))
+        return _services[name][1]
+
+
+def get_history(service):
+    """
+    History of `service` or of requests sent without service
+    """
+    return service and service.history or History(os.path.join(home, 'generic_history'))
+
+
+def get_token(service, session, stale=None):
+    """
+    Token of `service` acquired via service in its "auth" config. A new token is acquired
+    if cached one has expired or is `stale`
+    """
+    auth = service.config['auth']
+
+    def acquire():
+        try:
+            auth_service = get_service(auth['service'])
+        except Exception as e:
+            raise SystemExit('Error: Auth service not found - ' + str(e))
+        return acquire_token(auth_service, auth, session)
+
+    return service.token.get(acquire, stale)
+
+
+def get_generators():
+    """
+    Value generators shared by all requests of the process
+    """
+    global _generators
+    if _generators is None:
+        from generators import Generators
+        _generators = Generators()
+    return _generators
+
+
+def expand_generators(args):
+    """
+    Copy of `args` with value generators like {{seq}} in resource, -r values, -d data and
+    headers replaced by their next values if --generators or --bench is given. Returns `args`
+    itself otherwise or if it has none
+    """
+    if not (args.generators or args.bench):
+        return args
+    values = [getattr(args, 'resource/uri'), args.data] + (args.replace or []) + (args.headers or [])
+    if not any(value and '{{' in value for value in values):
+        return args
+    expand = get_generators().expand
+    args = copy.copy(args)
+    try:
+        setattr(args, 'resource/uri', expand(getattr(args, 'resource/uri')))
+        args.data = expand(args.data)
+        args.replace = args.replace and [expand(value) for value in args.replace]
+        args.headers = args.headers and [expand(value) for value in args.headers]
+    except ValueError as e:
+        raise SystemExit('Error: ' + str(e))
+    return args
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        from cache import Cache
+        _cache = Cache(os.path.join(home, '.cache.db'))
+    return _cache
+
+
+def cache_ttl(service, res_arg):
+    """
+    Seconds responses of resource are fresh for as given in resource or service config
+    """
+    return resource_config(service, res_arg, 'cache_ttl')
+
+
+def resource_config(service, res_arg, name, default=None):
+    """
+    `name` config of resource or its service
+    """
+    res = service.get_resource(res_arg) or {}
+    return res.get(name, service.config.get(name, default))
+
+
+def retry_policy(args, service, res_arg):
+    """
+    Retry `Policy` of "retry" config overridden by --retries or None if requests are not retried
+    """
+    from retry import Policy
+    config = service and resource_config(service, res_arg, 'retry') or {}
+    if args.retries is not None:
+        config = dict(config, attempts=args.retries + 1)
+    if not config:
+        return None
+    try:
+        return Policy(**config)
+    except TypeError:
+        raise SystemExit('Error: Invalid "retry" config {}'.format(config))
+
+
+def rate_limiter(args, service):
+    """
+    Rate limiter as per --rate-limit shared by all requests of the process or as per
+    "rate_limit" config shared by all requests of the service
+    """
+    if args.rate_limit:
+        key, rate = (None, args.rate_limit), args.rate_limit
+    else:
+        rate = service and service.config.get('rate_limit')
+        if not rate:
+            return None
+        key = (args.service, rate)
+    from retry import TokenBucket
+    with _services_lock:
+        if key not in _limiters:
+            _limiters[key] = TokenBucket(rate)
+        return _limiters[key]
+
+
+def mount_pool(session, uriprefix, pool_size):
+    """
+    Give `uriprefix` its own connection pool of `pool_size` keep-alive connections in `session`
+    """
+    from requests.adapters import HTTPAdapter
+    if uriprefix not in session.adapters:
+        session.mount(uriprefix, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+
+def timed(args, func, *func_args):
+    """
+    Return `func(*func_args)`. With --timing, time taken by each phase is printed on stderr
+    """
+    if not args.timing:
+        return func(*func_args)
+    from timing import Timer
+    timer = Timer()
+    try:
+        with timer:
+            return func(*func_args)
+    finally:
+        print(timer.report(args.timing), file=sys.stderr)
+
+
+def execute(args, session=None, out=None):
+    """
+    Execute with given args. With --timing, time taken by each phase is printed on stderr
+    """
+    return timed(args, send_and_print, args, session, out)
+
+
+def send_and_wait(args, session=None, out=None, store=True):
+    """
+    Send request described by args and return the response or with --wait-until, the
+    response the condition held on
+    """
+    if args.wait_until:
+        import requests
+        session = session or requests.Session()
+    r = send_request(args, session, out, store)
+    if args.wait_until:
+        r = wait_until(r, args, session)
+    return r
+
+
+def send_and_print(args, session=None, out=None):
+    """
+    Send request described by args and print the response
+    """
+    out = out or sys.stdout
+    if args.paginate:
+        import requests
+        session = session or requests.Session()
+    r = send_and_wait(args, session, out)
+    if args.paginate:
+        print_pages(r, args, session, out)
+    else:
+        print_response(r, args.output, out, fmt=output_format(args, out))
+    return 0
+
+
+def send_request(args, session=None, out=None, store=True):
+    """
+    Send request described by args and return the response. Request and response are
+    stored in history if `store` is given
+    """
+    out = out or sys.stdout
+    process_service_args(args, out)
+    args = expand_generators(args)
+
+    if args.cache_stats:
+        for name, value in get_cache().stats():
+            print('{:<15}{}'.format(name, value), file=out)
+        raise SystemExit()
+
     # Get service
     service = None
     if args.service:
         try:
-            service = Service(args.service)
+            with phase('service load'):
+                service = get_service(args.service)
         except Exception as e:
             raise SystemExit('Error: Service not found - ' + str(e))
 
-    process_service_args(service, args)
-
-    history = service and service.history or History(os.path.join(home, 'generic_history'))
+    history = get_history(service)
 
     # Print history if asked
     if args.history:
         for item in history.items(False):
-            print(item.printable())
+            print(item.printable(), file=out)
+        raise SystemExit()
+    if args.history_diff:
+        diff_responses(history, args.history_diff, out)
+        raise SystemExit()
+    if args.history_search is not None:
+        for item in history.search(args.method, args.history_search, args.since, args.until,
+                                   args.status, args.body, args.body_key):
+            print(item.printable(), file=out)
         raise SystemExit()
 
     # Get absolute URI
     res_arg = getattr(args, 'resource/uri')
-    uri, res_arg = get_uri(service, history, args.last, args.uriprefix, res_arg)
+    with phase('history'):
+        uri, res_arg = get_uri(service, history, args.last, args.uriprefix, res_arg)
 
     # List templates if asked
     if args.list_templates:
-        print(*service.get_template_names(res_arg), sep='\n')
+        print(*service.get_template_names(res_arg), sep='\n', file=out)
         raise SystemExit()
 
     # Use last req info but args take precedence
-    last_req = args.last and history[args.last] or HistoryItem(None, None)
+    with phase('history'):
+        last_req = args.last and history[args.last] or HistoryItem(None, None)
     method = args.method or last_req.method or 'get'
 
-    # Setup headers
+    with phase('imports'):
+        import requests
+        from requests.adapters import DEFAULT_POOLSIZE
+        from requests.structures import CaseInsensitiveDict
+    session = session or requests.Session()
+
+    # Setup headers. Token header from "auth" config is not needed if it is given with -H
+    # or in "headers" config (e.g. from environment variable)
     headers = service and service.headers or CaseInsensitiveDict()
-    if args.headers:
-        headers.update(parse_headers(args.headers))
+    arg_headers = CaseInsensitiveDict(parse_headers(args.headers or []))
+    token = None
+    auth = service and service.config.get('auth')
+    if auth and auth['header'] not in arg_headers and auth['header'] not in headers and \
+            not args.print_only:
+        with phase('auth'):
+            token = get_token(service, session)
+        headers[auth['header']] = token
+    headers.update(arg_headers)
+
+    # Service's requests share keep-alive connections from its own pool
+    if service:
+        mount_pool(session, args.uriprefix or service.uri_prefix(),
+                   args.pool_size or service.config.get('pool_size', DEFAULT_POOLSIZE))
 
     # Get body
-    body = get_body(service, last_req, res_arg, args, method, uri, headers)
+    with phase('body'):
+        body = get_body(service, last_req, res_arg, args, method, uri, headers, session)
 
     # Any printing
     if args.print_only:
-        print(method.upper(), uri, '\n{}'.format(body) if body else '')
+        print(method.upper(), uri, '\n{}'.format(body) if body else '', file=out)
         raise SystemExit()
     if args.print_body:
-        print(method.upper(), uri, '\n{}'.format(body) if body else '')
+        print(method.upper(), uri, '\n{}'.format(body) if body else '', file=out)
 
     # Store request in history
-    history.store_item(method.upper(), res_arg, body)
+    with phase('history'):
+        item_id = store and history.store_item(method.upper(), res_arg, body)
+
+    # Compress body as per --compress or "compress" config
+    data = body
+    encoding = args.compress or service and resource_config(service, res_arg, 'compress')
+    if encoding:
+        from compression import compress_body
+        try:
+            with phase('compress'):
+                data = compress_body(body, encoding, headers)
+        except ValueError as e:
+            raise SystemExit('Error: ' + str(e))
+    if body:
+        count('body bytes', len(body))
+        count('sent bytes', len(data))
 
     # Send request
-    r = requests.request(method.lower(), uri, data=body, headers=headers)
-
-    # Display response
-    content = r.text
+    cache = (args.cache or service and service.config.get('cache')) and get_cache()
+
+    policy = retry_policy(args, service, res_arg)
+    if policy:
+        from retry import send_with_retry
+    limiter = rate_limiter(args, service)
+    timeout = args.timeout or service and resource_config(service, res_arg, 'timeout')
+
+    def request():
+        if cache:
+            return cache.request(session, method.lower(), uri, headers,
+                                 service and cache_ttl(service, res_arg), data=data, stream=True,
+                                 timeout=timeout)
+        return session.request(method.lower(), uri, data=data, headers=headers, stream=True,
+                               timeout=timeout)
+
+    def send():
+        if limiter:
+            limiter.acquire()
+        if not args.timing:
+            return request()
+        from timing import instrumented
+        with instrumented(session):
+            return request()
+
+    def send_retrying():
+        try:
+            return send_with_retry(send, policy, method) if policy else send()
+        except requests.Timeout as e:
+            raise SystemExit('Error: Timed out after {}s - {}'.format(timeout, e))
+
+    r = send_retrying()
+    if r.status_code == 401 and token:
+        # Token was revoked before it expired
+        r.close()
+        headers[auth['header']] = get_token(service, session, stale=token)
+        r = send_retrying()
+    if args.timing:
+        from timing import count_response
+        count_response(r)
+    if store:
+        with phase('history'):
+            history.store_response(
+                item_id, r, record_body=args.record or service and service.config.get('record'))
+    return r
+
+
+def check_status(r, indent=4):
+    """
+    Raise SystemExit with response content if response is not successful
+    """
     if r.status_code not in success_codes:
+        content = r.text
         error = 'Error status: {}'.format(r.status_code)
         if content:
-            error += '\n{}'.format(pretty(content))
+            error += '\n{}'.format(pretty(content, indent))
         raise SystemExit(error)
-    if content:
-        if args.output:
-            content = json.loads(content)
-            part, prop = extract_body_part(content, args.output)
-            print(pretty(part[prop]))
+
+
+def output_format(args, out):
+    """
+    --format to print response in, defaulting to $CREST_FORMAT or "pretty". "auto" is
+    "pretty" if `out` is a terminal, otherwise "raw" or "compact" with -o
+    """
+    fmt = args.format or os.getenv('CREST_FORMAT') or 'pretty'
+    if fmt != 'auto':
+        return fmt
+    if hasattr(out, 'isatty') and out.isatty():
+        return 'pretty'
+    return 'compact' if args.output else 'raw'
+
+
+def write(text, out):
+    """
+    Write `text` followed by newline to `out` in chunks
+    """
+    for i in xrange(0, len(text), stream_chunk_size):
+        out.write(text[i:i + stream_chunk_size])
+    out.write('\n')
+
+
+def print_response(r, output, out, indent=4, fmt='pretty'):
+    """
+    Print response content or `output` part of it in format `fmt`: "pretty" with `indent`,
+    "compact", "ndjson" or "raw". Raises SystemExit if response is not successful.
+    Large responses are not read whole when `output` is given. With "ndjson", each element of
+    selected array is printed compactly in its own line as soon as it is received. "raw" writes
+    the content as it is received without decoding it unless `output` is given
+    """
+    check_status(r, indent)
+    length = r.headers.get('content-length')
+    if r.status_code == 204 or length == '0':
+        return
+    if fmt != 'pretty':
+        indent = None
+    try:
+        if fmt == 'ndjson':
+            part = compile_body_part(output or '')
+            with phase('receive+decode'):
+                for value in stream_body_part(r.iter_content(stream_chunk_size), part, each=True):
+                    write(jsonlib.dumps(value), out)
+                    out.flush()
+        elif fmt == 'raw' and not output:
+            last = None
+            with phase('receive'):
+                for chunk in r.iter_content(stream_chunk_size):
+                    out.write(chunk)
+                    last = chunk
+            if last and not last.endswith('\n'):
+                out.write('\n')
+        elif output and (length is None or int(length) > stream_threshold):
+            part = compile_body_part(output)
+            with phase('receive+decode'):
+                values = stream_body_part(r.iter_content(stream_chunk_size), part)
+                value = list(values) if part.many else next(values)
+            with phase('format'):
+                text = pretty(value, indent)
+            write(text, out)
+            # Rest of the body is not needed
+            r.close()
         else:
-            print(pretty(content))
-    return 0
+            with phase('receive'):
+                content = r.text
+            if not content:
+                return
+            if output:
+                with phase('decode'):
+                    content = compile_body_part(output).get(jsonlib.loads(content))
+            with phase('format'):
+                text = pretty(content, indent)
+            write(text, out)
+    except (ValueError, LookupError, TypeError) as e:
+        # Response is not JSON or does not have the selected part
+        raise SystemExit('Error: Cannot select {} from response - {}: {}'.format(
+            '-o ' + output if output else 'array elements', type(e).__name__, e))
+
+
+def follow_headers(r):
+    """
+    Headers of request of response `r` to send further requests like it
+    """
+    headers = r.request.headers.copy()
+    headers.pop('content-length', None)
+    return headers
+
+
+def wait_until(r, args, session):
+    """
+    Send request of response `r` again till --wait-until condition holds and return
+    the response it held on
+    """
+    from wait import wait
+    request = r.request
+    headers = follow_headers(r)
+
+    def get(extra_headers):
+        poll_headers = headers.copy()
+        poll_headers.update(extra_headers)
+        return session.request(request.method, request.url, data=request.body,
+                               headers=poll_headers)
+
+    r, polls, elapsed = wait(r, get, args.wait_until, args.wait_timeout, args.wait_interval)
+    print('"{}" held after {} polls in {:.1f}s'.format(args.wait_until.text, polls, elapsed),
+          file=sys.stderr)
+    return r
+
+
+def pagination_config(args, uri):
+    """
+    "pagination" config of resource of `uri` or its service
+    """
+    if not args.service:
+        return None
+    from urlparse import urlparse
+    service = get_service(args.service)
+    res = service.get_resource(urlparse(uri).path) or {}
+    return res.get('pagination', service.config.get('pagination'))
+
+
+def print_items(items, out, indent=4, fmt='pretty'):
+    """
+    Print `items` as JSON array, or each compactly in its own line with "ndjson" `fmt`,
+    as soon as each item is generated. Array is compact unless `fmt` is "pretty"
+    """
+    if fmt == 'ndjson':
+        for item in items:
+            write(jsonlib.dumps(item), out)
+            out.flush()
+        return
+    if fmt != 'pretty':
+        sep = '['
+        for item in items:
+            out.write(sep + jsonlib.dumps(item))
+            out.flush()
+            sep = ','
+        print('[]' if sep == '[' else ']', file=out)
+        return
+    prefix, sep = ' ' * indent, '[\n'
+    for item in items:
+        out.write(sep + prefix + jsonlib.dumps(item, indent).replace('\n', '\n' + prefix))
+        out.flush()
+        sep = ',\n'
+    print('[]' if sep == '[\n' else '\n]', file=out)
+
+
+def print_pages(r, args, session, out, indent=4):
+    """
+    Print items of all pages starting from response `r`. Each page's items are printed
+    as soon as it is received while next page is being requested
+    """
+    from paginate import paginated_items
+    headers = follow_headers(r)
+
+    def get(uri):
+        return session.get(uri, headers=headers)
+
+    items = paginated_items(r, get, pagination_config(args, r.url), args.output,
+                            args.max_pages, check=lambda page: check_status(page, indent))
+    print_items(items, out, indent, output_format(args, out))
 
 
 def setup_parser():
@@ -174,6 +665,34 @@ def setup_parser():
                         help='Replace JSON body part with new value. Can be used multiple times')
     generic.add_argument('-o', '--output', metavar='JSON body part',
                         help='Output specific part of JSON response body')
+    generic.add_argument('--format', choices=['pretty', 'compact', 'ndjson', 'raw', 'auto'],
+                        help=('Format to print response in. "compact" prints JSON without '
+                              'whitespace. "raw" prints response as received without decoding. '
+                              '"auto" is "pretty" on terminal and "raw" (or "compact" with -o) '
+                              'otherwise. Defaults to $CREST_FORMAT or "pretty"'))
+    generic.add_argument('--ndjson', action='store_const', dest='format', const='ndjson',
+                        help=('Print each element of JSON array response (or its -o part) '
+                              'compactly in its own line as soon as it is received. '
+                              'Same as --format ndjson'))
+    generic.add_argument('--paginate', action='store_true',
+                        help=('Follow next page links of response and print items of all pages. '
+                              'Items are taken from -o part or "items" of "pagination" config. '
+                              'Next page link is taken from Link header or "next" of "pagination" '
+                              'config'))
+    generic.add_argument('--max-pages', metavar='N', type=int, dest='max_pages',
+                        help='Print items of at most N pages with --paginate')
+    generic.add_argument('--wait-until', metavar='CONDITION', type=parse_condition,
+                        dest='wait_until',
+                        help=('Send request again till CONDITION on JSON response holds and then '
+                              'print the response. CONDITION is "body part op value" where op is '
+                              'one of == != < <= > >=. Ex: "group.activeCapacity >= 5"'))
+    generic.add_argument('--wait-timeout', metavar='SECONDS', type=float, default=300,
+                        dest='wait_timeout',
+                        help='Fail --wait-until if condition does not hold in SECONDS. Defaults to 300')
+    generic.add_argument('--wait-interval', metavar='SECONDS', type=float, default=1,
+                        dest='wait_interval',
+                        help=('Initial seconds between --wait-until requests. It doubles, up to 30s, '
+                              'while response does not change. Defaults to 1'))
     generic.add_argument('--print-only', help='Only print request going to be sent. Does not send',
                         dest='print_only', action='store_true')
     generic.add_argument('--print', help='Print request before sending',
@@ -182,12 +701,95 @@ def setup_parser():
                         help=('List requests sent. '
                               'Use --last to use any earlier sent request body.'
                               'Each service based on --service has its own history'))
+    generic.add_argument('--record', action='store_true',
+                         help=('Store response body in history. Can be enabled for a service '
+                               'with "record": True in config. See --history-diff'))
+    generic.add_argument('--history-diff', metavar='N', nargs='+', type=int, dest='history_diff',
+                         help=('Show difference between last two recorded responses of Nth request '
+                               'in history or between last responses of two given requests'))
+    generic.add_argument('--cache', action='store_true',
+                         help=('Use cached response of GET request while it is fresh and '
+                               'revalidate it with ETag or Last-Modified when stale. Can be enabled '
+                               'for a service with "cache": True in config. See --cache-stats'))
+    generic.add_argument('--cache-stats', action='store_true', dest='cache_stats',
+                         help='Show hits, revalidations, misses and bytes saved by --cache')
     generic.add_argument(
         '-l', '--last',
         help=('Use last Nth request body from history. Defaults to 1 if not given. '
               'Use --history to list earlier sent requests'),
         metavar='N', nargs='?', const=1, default=0, type=int)
 
+    generic.add_argument('--batch', metavar='FILE',
+                         help=('Send requests described in FILE, one set of crest arguments per line, '
+                               'over shared keep-alive connections. Use - to read from stdin. '
+                               'Prints one line of compact output per request'))
+    generic.add_argument('--workflow', metavar='FILE',
+                         help=('Run steps of workflow in FILE. Steps run as soon as steps whose '
+                               'response values they use have succeeded, independent steps '
+                               'concurrently. See usage.md for its format'))
+    generic.add_argument('--pool-size', metavar='N', type=int, dest='pool_size',
+                         help=('Number of keep-alive connections kept per URI prefix. '
+                               'Defaults to service config\'s "pool_size" or 10'))
+    generic.add_argument('--concurrency', metavar='N', type=int,
+                         help=('Number of --batch or --bench requests sent concurrently. Defaults '
+                               'to 1. Number of --workflow steps run concurrently defaults to '
+                               'number of steps'))
+    generic.add_argument('--gevent', action='store_true',
+                         help=('Send concurrent --batch and --replay requests in greenlets of '
+                               'gevent instead of threads. Needs gevent installed'))
+    generic.add_argument('--as-completed', action='store_true', dest='as_completed',
+                         help=('Print --batch results as requests complete instead of in '
+                               'input order. Implies --report'))
+    generic.add_argument('--report', action='store_true',
+                         help=('Prefix each --batch result with line number, status code and '
+                               'latency in milliseconds'))
+
+    generic.add_argument('--bench', action='store_true',
+                         help=('Send the request repeatedly for --duration seconds with --concurrency '
+                               'requests at a time or at --rate requests per second and report '
+                               'throughput, latency percentiles, statuses and bytes transferred. '
+                               'Value generators like {{seq}} are expanded for every request'))
+    generic.add_argument('--generators', action='store_true',
+                         help=('Replace value generators like {{seq}} in resource, -r values, -d '
+                               'data and headers by their next value. Implied by --bench'))
+    generic.add_argument('--duration', metavar='SECONDS', type=float, default=10,
+                         help='Seconds to run --bench for. Defaults to 10')
+    generic.add_argument('--rate', metavar='N', type=float,
+                         help=('Start N --bench requests per second. Latency is measured from when '
+                               'a request should have started. Use --concurrency to allow enough '
+                               'requests at a time'))
+    generic.add_argument('--bench-json', action='store_true', dest='bench_json',
+                         help='Print --bench report as JSON')
+
+    generic.add_argument('--compress', choices=['gzip', 'deflate', 'br', 'zstd'],
+                         help=('Send request body compressed with given encoding if it is larger '
+                               'than 1KB. br and zstd need brotli and zstandard packages. '
+                               'Defaults to "compress" of resource or service config'))
+    generic.add_argument('--retries', metavar='N', type=int,
+                         help=('Retry request upto N times if it fails with status 413, 429 or 503 '
+                               '(or "statuses" of "retry" config) after time given in Retry-After '
+                               'header or exponential backoff with jitter. Overrides "attempts" of '
+                               '"retry" config'))
+    generic.add_argument('--rate-limit', metavar='N', type=float, dest='rate_limit',
+                         help=('Send at most N requests per second. The limit is shared by all '
+                               'requests sent by the process, like --batch and --bench requests. '
+                               'Defaults to service config\'s "rate_limit"'))
+    generic.add_argument('--timeout', metavar='SECONDS', type=float,
+                         help=('Seconds to wait for connecting and for each read of response. '
+                               'Defaults to "timeout" of resource or service config'))
+
+    generic.add_argument('--timing', nargs='?', const='table', choices=['table', 'json'],
+                         help=('Print milliseconds taken by each phase of the request like service '
+                               'load, history, body, DNS, connect, TLS, wait for response, receive, '
+                               'decode and format on stderr as table (default) or JSON'))
+    generic.add_argument('--profile', metavar='FILE',
+                         help='Save cProfile stats of the run in FILE. See python -m pstats')
+
+    generic.add_argument('--daemon', action='store_true',
+                         help=('Run in foreground serving crest invocations over ~/.crest/.daemon.sock '
+                               'with warm connections and service configs. While it runs, crest '
+                               'forwards its arguments to it. Set CREST_NO_DAEMON=1 to bypass it'))
+
     # Service management
     generic.add_argument('--install-service', metavar='Config file path',
                          help=('Install service at ~/.crest described in config file '
@@ -199,6 +801,35 @@ def setup_parser():
     generic.add_argument('--list-services', action='store_true',
                          help='List installed services')
 
+    # History search
+    search = parser.add_argument_group(
+        'History search', 'Options to find requests in history. -m can be used to match method')
+    search.add_argument('--history-search', metavar='REGEX', nargs='?', const='',
+                        dest='history_search',
+                        help=('List requests in history whose resource matches REGEX '
+                              'and other search options given. Lists all if REGEX is not given'))
+    search.add_argument('--since', type=parse_time, metavar='TIME',
+                        help=('Requests sent at or after TIME. TIME is YYYY-MM-DD[THH:MM[:SS]] in '
+                              'local time or a duration ago like 30m, 2h or 7d'))
+    search.add_argument('--until', type=parse_time, metavar='TIME',
+                        help='Requests sent at or before TIME. See --since')
+    search.add_argument('--status', type=int, metavar='CODE',
+                        help='Requests whose response had status CODE')
+    search.add_argument('--body', metavar='TEXT', help='Requests whose body contains all words in TEXT')
+    search.add_argument('--body-key', metavar='KEY', dest='body_key',
+                        help='Requests whose JSON body has KEY in any object')
+
+    search.add_argument('--replay', metavar='N|A-B', nargs='?', const='',
+                        help=('Send requests in history again in their original order and print '
+                              'their status and latency next to original ones. Replays last N '
+                              'requests, requests A to B or all requests matching other history '
+                              'search options. Use --uriprefix to send them elsewhere'))
+    search.add_argument('--original-timing', metavar='FACTOR', nargs='?', const=1.0, type=float,
+                        dest='original_timing',
+                        help=('Start each replayed request at its original time since first '
+                              'one divided by FACTOR (default 1). Otherwise requests are sent as '
+                              'fast as possible, --concurrency at a time'))
+
     # Service specific options
     service = parser.add_argument_group('Service', 'Options that need --service arg')
     service.add_argument('-t', '--template', const='default', nargs='?',
@@ -208,11 +839,40 @@ def setup_parser():
     service.add_argument('--list-templates', action='store_true',
                          help='List existing templates for given resource')
     service.add_argument('--uriprefix', help='URI prefix overriding configured one')
+    service.add_argument('--endpoints', metavar='NAME[,NAME...]', type=lambda s: s.split(','),
+                         help=('Send request to given endpoints of "endpoints" config concurrently '
+                               'and compare their responses'))
+    service.add_argument('--all-endpoints', action='store_true', dest='all_endpoints',
+                         help='Send request to all endpoints. See --endpoints')
     service.add_argument('--resources', help='List possible resources', action='store_true')
 
     return parser
 
 
+def parse_condition(value):
+    from wait import Condition
+    try:
+        return Condition(value)
+    except ValueError as e:
+        raise ArgumentTypeError(str(e))
+
+
+def parse_time(value):
+    """
+    Epoch time of YYYY-MM-DD[THH:MM[:SS]] local time or duration ago like 30s, 10m, 2h or 7d
+    """
+    match = re.match(r'^(\d+)([smhd])$', value)
+    if match:
+        seconds = int(match.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+        return time.time() - seconds
+    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    raise ArgumentTypeError('Invalid time {!r}'.format(value))
+
+
 def expand_resource(service, uriprefix_arg, res_arg):
     uriprefix = uriprefix_arg or service.uri_prefix()
     if not uriprefix:
@@ -237,16 +897,18 @@ def get_uri(service, history, last, uriprefix, res_arg):
         return expand_resource(service, uriprefix, res_arg), res_arg
 
 
-def process_service_args(service, args):
-    service_options = ['template', 'list_templates', 'uriprefix', 'resources']
-    if not service and any([getattr(args, attr, None) for attr in service_options]):
+def process_service_args(args, out=None):
+    """
+    Process options listing or installing services. These use service registry and
+    do not load any service config
+    """
+    service_options = ['template', 'list_templates', 'uriprefix', 'resources', 'endpoints',
+                       'all_endpoints']
+    if not args.service and any([getattr(args, attr, None) for attr in service_options]):
         raise SystemExit('Error: Required --service argument not given')
-    # Print resources if asked
-    if args.resources:
-        print(*[r.get('help') for r in service.config['resources'].values()], sep='\n')
-        raise SystemExit()
     # install service
     if args.install_service:
+        import shutil
         service_name = extract_config_from_file(args.install_service)['name']
         service_path = os.path.join(home, service_name)
         os.makedirs(os.path.join(service_path, 'history'))
@@ -254,30 +916,69 @@ def process_service_args(service, args):
         raise SystemExit()
     # list services
     if args.list_services:
-        for _dir in os.listdir(home):
-            if _dir == 'generic_history':
-                continue
-            serv = extract_config_from_file(os.path.join(home, _dir, 'config.py'))
-            print('{:<15}{}'.format(serv['name'], serv['description']))
+        for _, serv in sorted(load_registry(home).items()):
+            print('{:<15}{}'.format(serv['name'], serv['description']), file=out)
+        raise SystemExit()
+    res_arg = getattr(args, 'resource/uri')
+    if args.resources or (args.list_templates and res_arg and not res_arg.startswith('http')):
+        entry = load_registry(home).get(args.service)
+        if not entry:
+            raise SystemExit('Error: Service not found - ' + args.service)
+        # Print resources if asked
+        if args.resources:
+            print(*[r['help'] for r in entry['resources']], sep='\n', file=out)
+        else:
+            print(*(find_resource(entry, res_arg) or {}).get('templates', []), sep='\n', file=out)
         raise SystemExit()
 
 
-def get_body(service, last_req, res_arg, args, method, uri, headers):
+def response_lines(response):
+    body = pretty(response.body) if response.body is not None else '<body not recorded>'
+    return ['Status: {}\n'.format(response.status)] + [line + '\n' for line in body.splitlines()]
+
+
+def diff_responses(history, indexes, out):
+    """
+    Print unified diff of last two recorded responses of one request index or
+    last responses of two request indexes
+    """
+    import difflib
+    if len(indexes) == 1:
+        responses = list(islice(history.responses(indexes[0]), 2))[::-1]
+    else:
+        responses = [next(history.responses(index), None) for index in indexes[:2]]
+    if len(responses) < 2 or None in responses:
+        raise SystemExit('Error: Two responses not found in history to compare')
+    a, b = responses
+    out.writelines(difflib.unified_diff(
+        response_lines(a), response_lines(b),
+        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(a.created)),
+        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(b.created))))
+
+
+def get_body(service, last_req, res_arg, args, method, uri, headers, session):
     """
     Get body of request to be sent
     """
     # TODO: Should it take args as param?
 
     body = None
+    rendered = False
     # First try args.data
     if args.data:
         body = open(args.data[1:]).read() if args.data.startswith('@') else args.data
-    # Then try template
+    # Then try template which is rendered with replacements
     elif args.template:
-        body = service.get_template_body(res_arg, args.template)
+        template = service.get_template(res_arg, args.template)
+        if template:
+            try:
+                body = template.render([r.split('=', 1) for r in args.replace or []])
+            except ValueError as e:
+                raise SystemExit('Error: ' + str(e))
+            rendered = True
     # then try GET resource for PUT
     elif args.get and method.upper() == 'PUT':
-        r = requests.get(uri, headers=headers)
+        r = session.get(uri, headers=headers)
         if r.status_code != 200:
             raise SystemExit('Error: GET {} returned {}. Content:\n{}'.format(
                 uri, r.status_code, pretty(r.text)))
@@ -289,7 +990,7 @@ def get_body(service, last_req, res_arg, args, method, uri, headers):
 
     # Replace body parts
     if body:
-        if args.replace:
+        if args.replace and not rendered:
             body_replacements = (r.split('=') for r in args.replace)
             body_d = json.loads(body) if isinstance(body, basestring) else body
             # TODO: Should not get resource dict directly
@@ -303,37 +1004,25 @@ def get_body(service, last_req, res_arg, args, method, uri, headers):
 
 
 def parse_body_part(name):
-    parts = re.split('\[(\d+)\]|(\w+)', name)
-    for part in parts:
-        if part and part != '.':
-            try:
-                yield int(part)
-            except ValueError:
-                yield part
+    return iter(compile_body_part(name).parts)
 
 
 def extract_body_part(body, name):
-    for part in parse_body_part(name):
-        prev = body
-        body = body[part]
-    return prev, part
+    return compile_body_part(name).parent(body)
 
 
-def update_body_part(body, name, new_value):
-    part, prop = extract_body_part(body, name)
+def update_body_part(body, name, new_value, aliases=None):
     try:
         new_value = int(new_value)
     except ValueError:
         pass
-    part[prop] = new_value
+    compile_body_part(name, aliases).set(body, new_value)
 
 
 def update_body_parts(res, body, extras):
+    aliases = res and res.get('aliases')
     for name, value in extras:
-        aliases = res and res.get('aliases')
-        if aliases:
-            name = aliases.get(name, name)
-        update_body_part(body, name, value)
+        update_body_part(body, name, value, aliases)
     return body
 
 
@@ -342,6 +1031,7 @@ def get_from_file(fname, content):
     TODO: Need better name?!?
     Display `content` in $EDITOR and return updated content
     """
+    import subprocess
     editor = os.getenv('EDITOR', 'vim')
     tmpfile = open(fname, 'w')
     with tmpfile:
@@ -353,18 +1043,101 @@ def get_from_file(fname, content):
         return tmpfile.read()
 
 
-def pretty(s):
+def pretty(s, indent=4):
+    """
+    `s` JSON or object formatted with `indent` or compactly if it is None. `s` is returned
+    as it is if it is not JSON
+    """
     try:
         if isinstance(s, basestring):
-            s = json.loads(s)
-        return json.dumps(s, indent=4)
+            s = jsonlib.loads(s)
+        return jsonlib.dumps(s, indent)
     except ValueError:
         return s
 
 
+def run_bench(args, out):
+    """
+    Send request described by `args` repeatedly as per --bench options and print the report
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from bench import bench
+    args = copy.copy(args)
+    args.concurrency = args.concurrency or 1
+    args.pool_size = max(args.pool_size or 0, args.concurrency)
+    session = requests.Session()
+    for prefix in ('http://', 'https://'):
+        session.mount(prefix, HTTPAdapter(pool_maxsize=args.concurrency))
+
+    def send():
+        r = send_request(args, session, out, store=False)
+        received = len(r.content)
+        return r.status_code, len(r.request.body or '') if r.request else 0, received
+
+    result = bench(send, args.duration, args.concurrency, args.rate)
+    if args.bench_json:
+        print(json.dumps(result.as_dict(), indent=4, sort_keys=True), file=out)
+    else:
+        print(result.printable(), file=out)
+    # Failing when no request got a response lets scripts notice a broken setup
+    return 0 if result.statuses else 1
+
+
+def run(parser, args, session=None, out=None, err=None):
+    """
+    Run crest with parsed `args`. Returns exit status. With --profile, the run is profiled
+    """
+    if not args.profile:
+        return dispatch(parser, args, session, out, err)
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(dispatch, parser, args, session, out, err)
+    finally:
+        profiler.dump_stats(args.profile)
+
+
+def dispatch(parser, args, session=None, out=None, err=None):
+    if args.batch:
+        from batch import run_batch
+        lines = sys.stdin if args.batch == '-' else open(args.batch)
+        with lines:
+            return 1 if run_batch(parser, lines, pool_size=args.pool_size,
+                                  concurrency=args.concurrency or 1,
+                                  as_completed=args.as_completed, report=args.report,
+                                  session=session, out=out or sys.stdout,
+                                  err=err or sys.stderr, rate_limit=args.rate_limit) else 0
+    if args.workflow:
+        from workflow import run_workflow
+        return 1 if run_workflow(parser, args.workflow, args.concurrency, args.rate_limit,
+                                 session, out or sys.stdout) else 0
+    if args.replay is not None:
+        from replay import run_replay
+        try:
+            service = args.service and get_service(args.service)
+        except Exception as e:
+            raise SystemExit('Error: Service not found - ' + str(e))
+        return 1 if run_replay(get_history(service), args, session, out or sys.stdout) else 0
+    if args.bench:
+        return run_bench(args, out or sys.stdout)
+    if args.endpoints or args.all_endpoints:
+        from endpoints import run_endpoints
+        return 1 if run_endpoints(args, session, out or sys.stdout) else 0
+    return execute(args, session, out)
+
+
 def main():
     p = setup_parser()
-    execute(p.parse_args(sys.argv[1:]))
+    args = p.parse_args(sys.argv[1:])
+    if args.gevent:
+        # Sockets must be patched before requests is imported
+        from engine import use_gevent
+        use_gevent()
+    if args.daemon:
+        from daemon import serve
+        serve(p)
+    sys.exit(run(p, args))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,76 @@
+"""
+Entry point of crest command. Forwards the invocation to `crest --daemon` if it is running,
+otherwise runs it in this process. Imports only what is needed to talk to the daemon
+"""
+
+import json
+import os
+import socket
+import sys
+
+
+socket_name = '.daemon.sock'
+
+
+def socket_path():
+    return os.path.join(os.path.expanduser('~/.crest'), socket_name)
+
+
+# Options that need this process' terminal, stdin or gevent
+local_options = ('-e', '--edit', '--daemon', '--gevent')
+
+# Long running modes would keep the daemon, which serves one invocation at a time, from
+# serving others and would go on after the client is interrupted
+long_running_options = ('--bench', '--wait-until', '--paginate', '--replay', '--workflow',
+                        '--batch')
+
+
+def local_only(argv):
+    """
+    Whether arguments need this process' terminal or stdin or run long and hence are not
+    forwarded
+    """
+    options = set(arg.split('=', 1)[0] for arg in argv if arg.startswith('-'))
+    return bool(options & set(local_options + long_running_options))
+
+
+def forward(argv, out=sys.stdout, err=sys.stderr, path=None):
+    """
+    Run `argv` in daemon listening at `path` (defaults to `socket_path()`) writing its output
+    to `out` and `err`. Returns exit status or None if daemon is not running
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path or socket_path())
+    except socket.error:
+        return None
+    try:
+        f = sock.makefile('rwb')
+        f.write(json.dumps({'argv': argv, 'env': dict(os.environ), 'cwd': os.getcwd(),
+                           'tty': hasattr(out, 'isatty') and out.isatty()}) + '\n')
+        f.flush()
+        for line in f:
+            message = json.loads(line)
+            if 'exit' in message:
+                return message['exit']
+            stream = out if 'out' in message else err
+            stream.write(message.get('out', message.get('err')).encode('utf-8'))
+            stream.flush()
+    finally:
+        sock.close()
+    err.write('Error: crest daemon stopped while running request\n')
+    return 1
+
+
+def main():
+    argv = sys.argv[1:]
+    if not os.getenv('CREST_NO_DAEMON') and not local_only(argv):
+        status = forward(argv)
+        if status is not None:
+            sys.exit(status)
+    from cli import main as cli_main
+    cli_main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Compression of request bodies sent with Content-Encoding header.
+
+gzip and deflate are always available, br needs brotli and zstd needs zstandard package.
+Responses are decompressed by urllib3 as they are read for encodings it supports.
+"""
+
+import zlib
+from io import BytesIO
+
+
+# Smaller bodies are sent as they are since compressing them saves nothing
+min_size = 1024
+
+
+def _gzip(data, level):
+    from gzip import GzipFile
+    buf = BytesIO()
+    # Fixed mtime keeps compressed bodies of same content same
+    with GzipFile(fileobj=buf, mode='wb', compresslevel=level or 6, mtime=0) as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def _deflate(data, level):
+    return zlib.compress(data, level or 6)
+
+
+def _brotli(data, level):
+    import brotli
+    return brotli.compress(data, quality=11 if level is None else level)
+
+
+def _zstd(data, level):
+    import zstandard
+    return zstandard.ZstdCompressor(level=level or 3).compress(data)
+
+
+compressors = {'gzip': _gzip, 'deflate': _deflate, 'br': _brotli, 'zstd': _zstd}
+
+
+def compress(data, encoding, level=None):
+    """
+    `data` compressed with `encoding`. Raises ValueError if it is not supported or its
+    package is not installed
+    """
+    if encoding not in compressors:
+        raise ValueError('Unknown encoding {}. Use one of {}'.format(
+            encoding, ', '.join(sorted(compressors))))
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+    try:
+        return compressors[encoding](data, level)
+    except ImportError as e:
+        raise ValueError('{} encoding needs a package not installed: {}'.format(encoding, e))
+
+
+def compress_body(body, encoding, headers, level=None):
+    """
+    `body` compressed with `encoding` if it is large enough to be worth it. Content-Encoding
+    is set in `headers` if it is compressed
+    """
+    if not body or len(body) < min_size:
+        return body
+    body = compress(body, encoding, level)
+    headers['Content-Encoding'] = encoding
+    return body
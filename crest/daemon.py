@@ -0,0 +1,132 @@
+"""
+Local server run by `crest --daemon` that keeps connections, service configs and caches warm
+across crest invocations. `crest.client` forwards invocations to it over a Unix socket.
+
+Each request is a JSON line with argv, environment and working directory of the client.
+Output is sent back as JSON lines of {"out": text} or {"err": text} followed by {"exit": status}.
+Requests are served one at a time since they run with client's environment and directory.
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+from SocketServer import StreamRequestHandler, UnixStreamServer
+
+import requests
+
+from cli import home, run
+from client import socket_name
+
+
+class _Writer(object):
+    """
+    File like object sending everything written to it as `stream` messages. `tty` tells
+    whether client's stream is a terminal
+    """
+
+    def __init__(self, wfile, stream, tty=False):
+        self.wfile = wfile
+        self.stream = stream
+        self.tty = tty
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, text):
+        if text:
+            if isinstance(text, str):
+                text = text.decode('utf-8', 'replace')
+            self.wfile.write(json.dumps({self.stream: text}) + '\n')
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        self.wfile.flush()
+
+
+def exit_status(e, err):
+    """
+    Exit status of process exiting with SystemExit `e` like python does
+    """
+    if e.code is None or isinstance(e.code, int):
+        return e.code or 0
+    print(e.code, file=err)
+    return 1
+
+
+class _Handler(StreamRequestHandler):
+
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        out, err = _Writer(self.wfile, 'out', request.get('tty')), _Writer(self.wfile, 'err')
+        status = self.server.run(request, out, err)
+        self.wfile.write(json.dumps({'exit': status}) + '\n')
+
+
+class Daemon(UnixStreamServer):
+
+    def __init__(self, path, parser):
+        UnixStreamServer.__init__(self, path, _Handler)
+        self.parser = parser
+        # Shared by all requests to reuse keep-alive connections
+        self.session = requests.Session()
+
+    def run(self, request, out, err):
+        """
+        Run crest with `request`'s argv, environment and working directory
+        """
+        saved = sys.stdout, sys.stderr, dict(os.environ), os.getcwd()
+        sys.stdout, sys.stderr = out, err
+        os.environ.clear()
+        os.environ.update(request['env'])
+        try:
+            os.chdir(request['cwd'])
+            args = self.parser.parse_args(request['argv'])
+            return run(self.parser, args, self.session, out, err)
+        except SystemExit as e:
+            return exit_status(e, err)
+        except Exception:
+            traceback.print_exc(file=err)
+            return 1
+        finally:
+            sys.stdout, sys.stderr = saved[:2]
+            os.environ.clear()
+            os.environ.update(saved[2])
+            os.chdir(saved[3])
+
+
+def serve(parser):
+    """
+    Serve crest invocations till interrupted
+    """
+    path = os.path.join(home, socket_name)
+    if os.path.exists(path):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+            raise SystemExit('Error: crest daemon is already running')
+        except socket.error:
+            # Left behind by daemon that did not stop cleanly
+            os.remove(path)
+        finally:
+            sock.close()
+    # Only this user can connect
+    os.umask(0o077)
+    server = Daemon(path, parser)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+    print('crest daemon listening on', path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+    raise SystemExit()
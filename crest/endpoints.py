@@ -0,0 +1,111 @@
+"""
+Send a request to many endpoints of a service concurrently and compare their responses
+"""
+
+from __future__ import print_function
+
+import copy
+import difflib
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+from StringIO import StringIO
+
+import requests
+
+from cli import get_service, output_format, print_response
+from engine import Result, run_request
+
+
+def select_endpoints(service, names=None):
+    """
+    OrderedDict of name and URI prefix of endpoints `names` of `service` or all of them
+    """
+    endpoints = service.endpoints()
+    if not endpoints:
+        raise SystemExit('Error: Service has no "endpoints" config')
+    unknown = [name for name in names or [] if name not in endpoints]
+    if unknown:
+        raise SystemExit('Error: Unknown endpoints {}. Configured endpoints: {}'.format(
+            ', '.join(unknown), ', '.join(sorted(endpoints))))
+    return OrderedDict((name, endpoints[name]) for name in names or sorted(endpoints))
+
+
+def run_endpoint(args, session, out, uriprefix):
+    """
+    Send request described by `args` with `uriprefix` and return its `Result` whose value
+    is the output formatted for `out` followed by error if any
+    """
+    args = copy.copy(args)
+    args.uriprefix = uriprefix
+    buf = StringIO()
+
+    def handle(r, args):
+        print_response(r, args.output, buf, fmt=output_format(args, out))
+
+    if uriprefix:
+        result = run_request(args, session, handle, out=buf)
+    else:
+        result = Result(args, None, 0, None, 'Error: URI prefix of endpoint not found')
+    if result.error:
+        print(result.error, file=buf)
+    return result._replace(value=buf.getvalue())
+
+
+def group_outputs(results):
+    """
+    List of (endpoints, output) of same outputs in order of their first endpoint given
+    (endpoint, result) `results`
+    """
+    groups = OrderedDict()
+    for endpoint, result in results:
+        groups.setdefault(result.value, []).append(endpoint)
+    return [(endpoints, output) for output, endpoints in groups.items()]
+
+
+def print_results(results, out):
+    """
+    Print status and latency of each (endpoint, result) of `results` followed by output of
+    first endpoint and diff of other outputs from it
+    """
+    for endpoint, result in results:
+        print('{:<15}{:<6}{:>10.1f} ms'.format(endpoint, result.status or '-',
+                                              result.latency * 1000), file=out)
+    groups = group_outputs(results)
+    first_endpoints, first = groups[0]
+    if len(groups) == 1:
+        print('\nSame output from all endpoints:', file=out)
+    else:
+        print('\n== {}'.format(', '.join(first_endpoints)), file=out)
+    out.write(first)
+    for endpoints, output in groups[1:]:
+        name = ', '.join(endpoints)
+        print('\n== {} differs:'.format(name), file=out)
+        out.writelines(difflib.unified_diff(
+            first.splitlines(True), output.splitlines(True), ', '.join(first_endpoints), name))
+
+
+def run_endpoints(args, session=None, out=None):
+    """
+    Send request described by `args` to --endpoints or all endpoints of its service
+    concurrently and print their results. Returns number of endpoints that failed
+    """
+    if not args.service:
+        raise SystemExit('Error: Required --service argument not given')
+    try:
+        service = get_service(args.service)
+    except Exception as e:
+        raise SystemExit('Error: Service not found - ' + str(e))
+    endpoints = select_endpoints(service, args.endpoints)
+    session = session or requests.Session()
+
+    def run(endpoint):
+        name, uriprefix = endpoint
+        return name, run_endpoint(args, session, out, uriprefix)
+
+    pool = ThreadPool(len(endpoints))
+    try:
+        results = pool.map(run, endpoints.items())
+    finally:
+        pool.terminate()
+    print_results(results, out)
+    return sum(result.error is not None for _, result in results)
@@ -0,0 +1,169 @@
+"""
+Python API to send many crest requests concurrently from one process:
+
+    from crest.engine import Engine
+    engine = Engine(concurrency=100)
+    for result in engine.as_completed('-s autoscale groups/{}/state -o group'.format(group)
+                                      for group in groups):
+        print result.status, result.value
+
+Requests are described by crest command line arguments and are sent like crest sends them:
+service headers, auth, templates, -r replacements, -o extraction and history. They share
+keep-alive connections of one session. Requests run in greenlets if gevent is installed and
+has patched socket module (see `use_gevent`), so that thousands of them can be in flight,
+otherwise in a pool of threads.
+"""
+
+import shlex
+import time
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+from StringIO import StringIO
+
+import jsonlib
+from bodypart import compile_body_part
+from cli import check_status, send_and_wait, setup_parser, timed
+
+
+Result = namedtuple('Result', 'argv status latency value error')
+
+
+def run_request(argv, session, handle=None, parser=None, defaults=None, out=None, store=True):
+    """
+    Send request described by `argv` over `session` and return its `Result`. `argv` is crest
+    arguments as string or list parsed by `parser` or already parsed arguments. `defaults` are
+    values of arguments not given. The request is sent like `crest.cli.execute` sends it, with
+    --wait-until and --timing. Value of result is what `handle(r, args)` returns for response
+    `r`, by default `response_value` of successful response. Output of options like
+    --print-only goes to `out`. Requests are stored in history if `store` is given.
+    A failure is returned as error of the result instead of being raised so that it does not
+    stop other requests
+    """
+    value = error = None
+    responses = []
+    start = time.time()
+
+    def send(args):
+        responses.append(send_and_wait(args, session, out or StringIO(), store))
+        return (handle or _checked_value)(responses[0], args)
+
+    try:
+        args = argv
+        if parser is not None:
+            args = parser.parse_args(shlex.split(argv) if isinstance(argv, basestring) else argv)
+        for name, default in (defaults or {}).items():
+            setattr(args, name, getattr(args, name) or default)
+        if args.paginate:
+            raise SystemExit('Error: --paginate is supported only when sending one request')
+        value = timed(args, send, args)
+    except SystemExit as e:
+        # SystemExit without code is raised after --print-only and the like succeed
+        if e.code:
+            error = 'usage error' if e.code == 2 else str(e.code)
+    except Exception as e:
+        error = 'Error: {}'.format(e)
+    status = responses[0].status_code if responses else None
+    return Result(argv, status, time.time() - start, value, error)
+
+
+def use_gevent():
+    """
+    Patch blocking modules with gevent so that requests run in greenlets. Must be called
+    before requests is imported. Raises SystemExit if gevent is not installed
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        raise SystemExit('Error: gevent is not installed')
+    monkey.patch_all()
+
+
+def make_pool(size):
+    """
+    Pool of `size` greenlets if socket module is patched by gevent, otherwise of threads.
+    Both have `imap` and `imap_unordered`
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return ThreadPool(size)
+    if not monkey.is_module_patched('socket'):
+        return ThreadPool(size)
+    from gevent.pool import Pool
+    return Pool(size)
+
+
+def close_pool(pool):
+    if isinstance(pool, ThreadPool):
+        pool.terminate()
+    else:
+        pool.kill()
+
+
+def response_value(r, output=None):
+    """
+    -o `output` part of response `r` or its JSON or text
+    """
+    text = r.text
+    if not text:
+        return None
+    try:
+        body = jsonlib.loads(text)
+    except ValueError:
+        return text
+    return compile_body_part(output).get(body) if output else body
+
+
+def _checked_value(r, args):
+    check_status(r, None)
+    return response_value(r, args.output)
+
+
+class Engine(object):
+    """
+    Sends requests described by crest arguments with upto `concurrency` in flight over
+    shared `session`. Requests are stored in history if `store` is given
+    """
+
+    def __init__(self, concurrency=10, session=None, store=True):
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.concurrency = concurrency
+        self.store = store
+        self.parser = setup_parser()
+        if session is None:
+            session = requests.Session()
+            # Requests without service share these pools
+            for prefix in ('http://', 'https://'):
+                session.mount(prefix, HTTPAdapter(pool_maxsize=concurrency))
+        self.session = session
+
+    def send(self, argv):
+        """
+        Send request described by `argv` (string or list of arguments) and return its `Result`.
+        `value` of result is -o part of JSON response, whole JSON response without -o or
+        response text if it is not JSON. `error` is the message of failed request
+        """
+        return run_request(argv, self.session, parser=self.parser,
+                           defaults={'pool_size': self.concurrency}, store=self.store)
+
+    def _results(self, argvs, ordered):
+        pool = make_pool(self.concurrency)
+        try:
+            imap = pool.imap if ordered else pool.imap_unordered
+            for result in imap(self.send, argvs):
+                yield result
+        finally:
+            close_pool(pool)
+
+    def map(self, argvs):
+        """
+        Generate `Result` of each of `argvs` in their order
+        """
+        return self._results(argvs, True)
+
+    def as_completed(self, argvs):
+        """
+        Generate `Result` of each of `argvs` as soon as it completes
+        """
+        return self._results(argvs, False)
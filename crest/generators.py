@@ -0,0 +1,95 @@
+"""
+Value generators like ``{{seq}}`` in resource, -r values, -d data and headers that are
+replaced with a new value for each request:
+
+- ``{{seq}}``: 1, 2, 3... for every request sent by the process
+- ``{{uuid}}``: random UUID
+- ``{{rand:MIN-MAX}}``: random integer between MIN and MAX, both included
+- ``{{choice:a,b,c}}``: one of the comma separated values at random
+- ``{{time}}``: current epoch time in seconds
+
+Other ``{{name}}`` text is left as it is. A generator preceded by backslash like ``\\{{seq}}``
+is not replaced; only the backslash is removed.
+"""
+
+import itertools
+import random
+import re
+import threading
+import time
+
+
+names = ('seq', 'uuid', 'rand', 'choice', 'time')
+
+_generator_re = re.compile(r'(\\)?\{\{(\w+)(?::([^}]*))?\}\}')
+# Backslash escaping a generator is itself escaped in JSON text
+_json_generator_re = re.compile(r'(\\\\)?\{\{(\w+)(?::([^}]*))?\}\}')
+
+
+def _literal(match):
+    """
+    Text of generator `match` if it is not to be replaced or None
+    """
+    escape, name, _ = match.groups()
+    if escape:
+        return match.group(0)[len(escape):]
+    if name not in names:
+        return match.group(0)
+    return None
+
+
+class Generators(object):
+    """
+    Expands generators in text. `seq` is shared by all expansions
+    """
+
+    def __init__(self):
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def value(self, name, arg=None):
+        """
+        Next value of generator `name` with argument `arg`
+        """
+        if name == 'seq':
+            with self._lock:
+                return str(next(self._seq))
+        if name == 'uuid':
+            import uuid
+            return str(uuid.uuid4())
+        if name == 'rand':
+            low, _, high = (arg or '').partition('-')
+            return str(random.randint(int(low), int(high)))
+        if name == 'choice':
+            return random.choice(arg.split(','))
+        if name == 'time':
+            return str(int(time.time()))
+        raise ValueError('Unknown generator {{{{{}}}}}'.format(name))
+
+    def _value(self, match):
+        literal = _literal(match)
+        return self.value(*match.groups()[1:]) if literal is None else literal
+
+    def expand(self, text):
+        """
+        Return `text` with each generator replaced by its next value
+        """
+        if text is None or '{{' not in text:
+            return text
+        return _generator_re.sub(self._value, text)
+
+
+def parse(text, json_text=False):
+    """
+    Split `text` into list of literal strings and (name, arg) of generators in it.
+    With `json_text`, `text` is JSON in whose strings the generators are
+    """
+    parsed = []
+    start = 0
+    for match in (_json_generator_re if json_text else _generator_re).finditer(text):
+        parsed.append(text[start:match.start()])
+        literal = _literal(match)
+        parsed.append(match.groups()[1:] if literal is None else literal)
+        start = match.end()
+    parsed.append(text[start:])
+    return [item for item in parsed if item != '']
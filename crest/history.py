@@ -1,82 +1,381 @@
 from __future__ import print_function
 
+import json
 import os
-from operator import add
+import re
+import threading
+import time
+import zlib
+
+# sqlite3, hashlib and urlparse are imported where used as history is not needed by
+# service listing options which should start fast
+
+
+_word_re = re.compile(r'\w+')
+_literal_re = re.compile(r'^[\w\-]+$')
+
+
+def _segments(resource):
+    if resource.startswith('http'):
+        from urlparse import urlparse
+        resource = urlparse(resource).path
+    return [segment for segment in resource.lower().split('/') if segment]
+
+
+def _required_segments(regex):
+    """
+    Segments every resource matching `regex` has. Nothing unless all pieces between its
+    first and last slash are literal and both slashes are required, as otherwise a resource
+    without such segment could match
+    """
+    if any(char in regex for char in '|(['):
+        return []
+    pieces = regex.lower().split('/')
+    middle = [piece for piece in pieces[1:-1] if piece]
+    if not all(_literal_re.match(piece) for piece in middle) or pieces[-1][:1] in ('?', '*', '{'):
+        return []
+    return middle
+
+
+def _body_keys(body):
+    """
+    Generate keys of all objects in JSON `body`
+    """
+    if isinstance(body, dict):
+        for key, value in body.items():
+            yield key
+            for key in _body_keys(value):
+                yield key
+    elif isinstance(body, list):
+        for value in body:
+            for key in _body_keys(value):
+                yield key
+
+
+def _terms(resource, body):
+    """
+    Terms of inverted index: resource path segments, body keys and words in body
+    """
+    terms = set('s:' + segment for segment in _segments(resource))
+    if body:
+        terms.update('w:' + word for word in _word_re.findall(body.lower()))
+        try:
+            terms.update('k:' + key.lower() for key in _body_keys(json.loads(body)))
+        except ValueError:
+            pass
+    return terms
 
 
 class History(object):
     """
     History of requests
+
+    Requests are appended to a SQLite database in history directory. Request with index N
+    (most recent being 1) is row with id `last + 1 - N`, so getting any item, latest page of items
+    or the last item is a primary key lookup regardless of number of items.
+
+    Each stored request is also added to an inverted index of its resource path segments,
+    body keys and body words which is used by `search`.
+
+    Every response to a request is stored with its status, headers, latency and size.
+    Response bodies, when recorded, are stored zlib compressed once per distinct content
     """
+    # Serializes access from concurrent requests even across instances of same path
+    _lock = threading.Lock()
+
+    db_name = 'history.db'
+    schema_version = 2
+
+    # Larger response bodies are not recorded
+    max_body_size = 1024 * 1024
+
     def __init__(self, path):
         self.path = path
+        self._db = None
 
-    def _last(self):
+    def _conn(self):
+        if self._db is None:
+            import sqlite3
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            db_path = os.path.join(self.path, self.db_name)
+            exists = os.path.exists(db_path)
+            db = sqlite3.connect(db_path, check_same_thread=False)
+            db.text_factory = str
+            # Appends need not wait for fsync of whole database
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            with db:
+                db.execute('CREATE TABLE IF NOT EXISTS requests ('
+                           'id INTEGER PRIMARY KEY, method TEXT NOT NULL, '
+                           'resource TEXT NOT NULL, body TEXT, created REAL)')
+                if not exists:
+                    self._migrate(db)
+                self._upgrade(db)
+            self._db = db
+        return self._db
+
+    def _migrate(self, db):
+        """
+        Import items from earlier layout of one file per request numbered till HEAD file
+        """
         try:
             with open(os.path.join(self.path, 'HEAD')) as f:
-                return int(f.read().strip())
-        except IOError:
-            return 0
+                last = int(f.read().strip())
+        except (IOError, ValueError):
+            return
+        for findex in xrange(1, last + 1):
+            fpath = os.path.join(self.path, '{:0=5d}'.format(findex))
+            try:
+                with open(fpath) as f:
+                    lines = f.readlines()
+            except IOError:
+                continue
+            # body was printed with trailing newline
+            body = ''.join(lines[2:])[:-1] or None
+            db.execute('INSERT INTO requests (method, resource, body, created) '
+                       'VALUES (?, ?, ?, ?)',
+                       (lines[0].strip(), lines[1].strip(), body, os.path.getmtime(fpath)))
 
-    def _fname(self, index):
-        return '{:0=5d}'.format(index)
+    def _upgrade(self, db):
+        """
+        Upgrade database created by earlier version to current schema
+        """
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+        if version < 1:
+            columns = [row[1] for row in db.execute('PRAGMA table_info(requests)')]
+            if 'status' not in columns:
+                db.execute('ALTER TABLE requests ADD COLUMN status INTEGER')
+            db.execute('CREATE INDEX IF NOT EXISTS requests_created ON requests (created)')
+            db.execute('CREATE TABLE IF NOT EXISTS terms ('
+                       'term TEXT NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (term, id)) '
+                       'WITHOUT ROWID')
+            for _id, resource, body in db.execute('SELECT id, resource, body FROM requests'):
+                self._index(db, _id, resource, body)
+        if version < 2:
+            db.execute('CREATE TABLE IF NOT EXISTS responses ('
+                       'id INTEGER PRIMARY KEY, request INTEGER NOT NULL, status INTEGER, '
+                       'headers TEXT, elapsed REAL, size INTEGER, body_hash TEXT, created REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS responses_request '
+                       'ON responses (request, id)')
+            db.execute('CREATE TABLE IF NOT EXISTS bodies (hash TEXT PRIMARY KEY, data BLOB)')
+        db.execute('PRAGMA user_version = {}'.format(self.schema_version))
 
-    def _fpath(self, index):
-        return os.path.join(self.path, self._fname(index))
+    def _index(self, db, _id, resource, body):
+        db.executemany('INSERT OR IGNORE INTO terms (term, id) VALUES (?, ?)',
+                       ((term, _id) for term in _terms(resource, body)))
 
-    def _extract_item(self, fpath, index=None, include_body=True):
-        with open(fpath) as f:
-            lines = f.readlines()
-            body = reduce(add, lines[2:], '') or None if include_body else None
-            return HistoryItem(lines[0].strip(), lines[1].strip(), body=body, index=index)
+    def _query(self, sql, *params):
+        with self._lock:
+            return self._conn().execute(sql, params).fetchall()
 
-    def items(self, include_body=True):
-        try:
-            last = self._last()
-            for findex in xrange(last, 0, -1):
-                yield self._extract_item(self._fpath(findex), index=(last - findex + 1),
-                                         include_body=include_body)
-        except IOError:
-            # Stop processing on any error
-            pass
+    def _last(self):
+        return self._query('SELECT max(id) FROM requests')[0][0] or 0
+
+    _item_columns = ('requests.id, method, resource, {}, '
+                     'coalesce(responses.status, requests.status), elapsed, size, '
+                     'requests.created '
+                     'FROM requests LEFT JOIN responses ON responses.id = '
+                     '(SELECT max(id) FROM responses WHERE request = requests.id)')
+
+    def _item(self, row, last):
+        _id, method, resource, body, status, elapsed, size, created = row
+        return HistoryItem(method, resource, body=body, index=last - _id + 1,
+                           status=status, elapsed=elapsed, size=size, created=created)
+
+    def items(self, include_body=True, page_size=100):
+        """
+        Generate items with their latest response starting from most recent one,
+        reading `page_size` items at a time
+        """
+        columns = self._item_columns.format('body' if include_body else 'NULL')
+        last = self._last()
+        start = last
+        while start > 0:
+            rows = self._query('SELECT {} WHERE requests.id <= ? ORDER BY requests.id DESC '
+                               'LIMIT ?'.format(columns), start, page_size)
+            if not rows:
+                return
+            for row in rows:
+                yield self._item(row, last)
+            start = rows[-1][0] - 1
 
     def __getitem__(self, index):
-        return self._extract_item(self._fpath(self._last() + 1 - index),
-                                  include_body=True)
+        rows = self._query('SELECT method, resource, body FROM requests WHERE id = ?',
+                           self._last() + 1 - index)
+        if not rows:
+            raise IndexError('No request {} in history'.format(index))
+        method, resource, body = rows[0]
+        return HistoryItem(method, resource, body=body)
+
+    def search(self, method=None, resource=None, since=None, until=None, status=None,
+               body=None, body_key=None, include_body=False, indexes=None):
+        """
+        Generate items matching all given criteria starting from most recent one.
+        `resource` is a regex searched in resource, `since` and `until` are epoch times,
+        `body` is text whose all words are in body, `body_key` is key of any object in body
+        and `indexes` is (first, last) range of indexes.
+        Criteria are checked with column indexes and the inverted index without reading bodies.
+        Items have their body only if `include_body` is given
+        """
+        last = self._last()
+        where, params, terms = [], [], []
+        if indexes:
+            first_index, last_index = indexes
+            where.append('requests.id BETWEEN ? AND ?')
+            params.extend([last + 1 - last_index, last + 1 - first_index])
+        if method:
+            where.append('method = ?')
+            params.append(method.upper())
+        if since is not None:
+            where.append('requests.created >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('requests.created <= ?')
+            params.append(until)
+        if status is not None:
+            where.append('requests.status = ?')
+            params.append(status)
+        if resource:
+            terms.extend('s:' + segment for segment in _required_segments(resource))
+            resource_re = re.compile(resource, re.IGNORECASE)
+        if body:
+            terms.extend('w:' + word for word in _word_re.findall(body.lower()))
+        if body_key:
+            terms.append('k:' + body_key.lower())
+        for term in terms:
+            where.append('requests.id IN (SELECT id FROM terms WHERE term = ?)')
+            params.append(term)
+        # Bodies of rows filtered by resource regex are read only if they match
+        rows = self._query('SELECT {} {} ORDER BY requests.id DESC'.format(
+            self._item_columns.format('body' if include_body and not resource else 'NULL'),
+            'WHERE ' + ' AND '.join(where) if where else ''), *params)
+        for row in rows:
+            if not resource:
+                yield self._item(row, last)
+            elif resource_re.search(row[2]):
+                if include_body:
+                    row = row[:3] + self._query('SELECT body FROM requests WHERE id = ?',
+                                                row[0])[0] + row[4:]
+                yield self._item(row, last)
 
     def store_item(self, method, resource, body):
+        """
+        Store request and return its id to be used with `store_response`
+        """
         # TODO: Should it take `HistoryItem` as arg?
-        last = self._last()
-        # Do not store if it is same as last item
-        try:
-            last_item = self._extract_item(self._fpath(last))
-            if last_item == HistoryItem(method, resource, body=body):
-                return
-        except IOError:
-            # last item does not exist
-            pass
-        new_filepath = self._fpath(last + 1)
-        with open(new_filepath, 'w') as f:
-            args = body and (method, resource, body) or (method, resource, )
-            print(*args, sep='\n', file=f)
-            with open(os.path.join(self.path, 'HEAD'), 'w') as hf:
-                hf.write(self._fname(last + 1))
+        with self._lock:
+            db = self._conn()
+            with db:
+                # Do not store if it is same as last item
+                last = db.execute('SELECT id, method, resource, body FROM requests '
+                                  'ORDER BY id DESC LIMIT 1').fetchone()
+                if last and last[1:] == (method, resource, body):
+                    return last[0]
+                _id = db.execute('INSERT INTO requests (method, resource, body, created) '
+                                 'VALUES (?, ?, ?, ?)',
+                                 (method, resource, body, time.time())).lastrowid
+                self._index(db, _id, resource, body)
+                return _id
+
+    def store_response(self, _id, r, record_body=False):
+        """
+        Store response `r` of request stored with id `_id`. With `record_body`, its body is
+        stored once it is read whole if it is not larger than `max_body_size`. Reading the
+        body is left to the caller so that it can be streamed
+        """
+        size = r.headers.get('content-length')
+        size = int(size) if size else None
+        with self._lock:
+            db = self._conn()
+            with db:
+                response_id = db.execute(
+                    'INSERT INTO responses (request, status, headers, elapsed, size, '
+                    'body_hash, created) VALUES (?, ?, ?, ?, ?, NULL, ?)',
+                    (_id, r.status_code, json.dumps(dict(r.headers)),
+                     r.elapsed.total_seconds(), size, time.time())).lastrowid
+                db.execute('UPDATE requests SET status = ? WHERE id = ?', (r.status_code, _id))
+        if not record_body or size is not None and size > self.max_body_size:
+            return
+        if r._content is not False:
+            # Already read like responses from cache
+            self._record_body(response_id, r._content)
+            return
+        iter_content = r.iter_content
+
+        def recorded(*args, **kwargs):
+            chunks, read = [], 0
+            for chunk in iter_content(*args, **kwargs):
+                read += len(chunk)
+                if read <= self.max_body_size:
+                    chunks.append(chunk)
+                yield chunk
+            # Only body read whole is recorded
+            if read <= self.max_body_size:
+                self._record_body(response_id, ''.join(chunks))
+
+        r.iter_content = recorded
+
+    def _record_body(self, response_id, content):
+        import hashlib
+        body_hash = hashlib.sha1(content).hexdigest()
+        with self._lock:
+            db = self._conn()
+            with db:
+                if not db.execute('SELECT 1 FROM bodies WHERE hash = ?', (body_hash,)).fetchone():
+                    db.execute('INSERT INTO bodies (hash, data) VALUES (?, ?)',
+                               (body_hash, buffer(zlib.compress(content))))
+                db.execute('UPDATE responses SET size = ?, body_hash = ? WHERE id = ?',
+                           (len(content), body_hash, response_id))
+
+    def responses(self, index):
+        """
+        Generate responses of item at `index` starting from most recent one
+        """
+        rows = self._query('SELECT status, headers, elapsed, size, data, created FROM responses '
+                           'LEFT JOIN bodies ON hash = body_hash WHERE request = ? '
+                           'ORDER BY id DESC', self._last() + 1 - index)
+        for status, headers, elapsed, size, data, created in rows:
+            yield HistoryResponse(status, json.loads(headers), elapsed, size,
+                                  data and zlib.decompress(data), created)
 
 
 class HistoryItem(object):
     # TODO: Since an item is a request not something generic, should the name
     # be changed to Request?
 
-    def __init__(self, method, resource, body=None, index=None):
+    def __init__(self, method, resource, body=None, index=None, status=None, elapsed=None,
+                 size=None, created=None):
         self.method = method
         self.resource = resource
         self.body = body
         self.index = index
+        # Latest response's status, latency in seconds and body size
+        self.status = status
+        self.elapsed = elapsed
+        self.size = size
+        # Epoch time request was sent
+        self.created = created
 
     def printable(self):
-        return '{:<6}{:<10}{}'.format(self.index, self.method, self.resource)
+        return '{:<6}{:<8}{:<7}{:>9}{:>10}  {}'.format(
+            self.index, self.method, self.status or '-',
+            '-' if self.elapsed is None else '{:.0f}ms'.format(self.elapsed * 1000),
+            '-' if self.size is None else self.size, self.resource)
 
     def __eq__(self, other):
         return isinstance(other, HistoryItem) and self.__dict__ == other.__dict__
 
 
+class HistoryResponse(object):
+    """
+    Response stored in history. `body` is None if it was not recorded
+    """
+
+    def __init__(self, status, headers, elapsed, size, body, created):
+        self.status = status
+        self.headers = headers
+        self.elapsed = elapsed
+        self.size = size
+        self.body = body
+        self.created = created
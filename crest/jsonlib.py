@@ -0,0 +1,73 @@
+"""
+JSON decoding and encoding with fastest library available.
+
+ujson is used if installed, then simplejson and json module otherwise. CREST_JSON environment
+variable can name the one to use. orjson is not supported as it requires python 3.
+ujson does not put space after ":" when indenting, so indented JSON is formatted by
+simplejson or json module to look the same with every backend.
+"""
+
+import os
+
+
+backends = ('ujson', 'simplejson', 'json')
+
+
+class Backend(object):
+    """
+    `loads` and `dumps` of a JSON library. `dumps` gives compact JSON if `indent` is None
+    """
+
+    def __init__(self, name):
+        self.name = name
+        module = __import__(name)
+        self._module = module
+        self._indenter = module
+        if name == 'ujson':
+            self.loads = lambda s: module.loads(s, precise_float=True)
+            try:
+                import simplejson as indenter
+            except ImportError:
+                import json as indenter
+            self._indenter = indenter
+        else:
+            self.loads = module.loads
+
+    def dumps(self, obj, indent=None):
+        if indent is not None:
+            # json module of python 2 leaves a space after "," at line ends unless told not to
+            return self._indenter.dumps(obj, indent=indent, separators=(',', ': '))
+        if self.name == 'ujson':
+            return self._module.dumps(obj, escape_forward_slashes=False, double_precision=15)
+        return self._module.dumps(obj, separators=(',', ':'))
+
+
+def load_backend(name=None):
+    """
+    Backend of library `name` or of first library installed from `backends`
+    """
+    if name:
+        return Backend(name)
+    for name in backends:
+        try:
+            return Backend(name)
+        except ImportError:
+            pass
+
+
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = load_backend(os.getenv('CREST_JSON'))
+    return _backend
+
+
+def loads(s):
+    return backend().loads(s)
+
+
+def dumps(obj, indent=None):
+    return backend().dumps(obj, indent)
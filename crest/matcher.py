@@ -0,0 +1,64 @@
+"""
+Find service's resource config matching a resource path
+"""
+
+import re
+import sre_parse
+from sre_constants import LITERAL
+
+
+def required_literal(pattern):
+    """
+    Longest text, in lower case, that every string in which `pattern` is found must contain
+    """
+    longest, run = '', ''
+    for op, av in sre_parse.parse(pattern):
+        if op == LITERAL and av < 128:
+            run += chr(av)
+        else:
+            longest, run = max(longest, run, key=len), ''
+    return max(longest, run, key=len).lower()
+
+
+class ResourceMatcher(object):
+    """
+    Matches resource paths against resource patterns of a service config.
+
+    Patterns are tried in deterministic priority order: higher "priority" of resource config
+    (defaults to 0) first, then longer (more specific) pattern first, then alphabetically.
+    Each pattern is compiled once along with the literal text it requires so that patterns
+    whose literal is not in the path are skipped without running the regex. Results of recent
+    paths are remembered
+    """
+
+    cache_size = 1024
+
+    def __init__(self, resources):
+        """
+        `resources` is list of (pattern, resource config) pairs
+        """
+        resources = sorted(
+            resources, key=lambda (pattern, res): (-res.get('priority', 0), -len(pattern), pattern))
+        self._patterns = [(required_literal(pattern), re.compile(pattern, re.IGNORECASE), res)
+                          for pattern, res in resources]
+        self._cache = {}
+
+    def _match(self, res):
+        lower = res.lower()
+        for literal, regex, resource in self._patterns:
+            if literal in lower and regex.search(res):
+                return resource
+
+    def match(self, res):
+        """
+        Return config of highest priority resource whose pattern is found in `res`
+        """
+        try:
+            return self._cache[res]
+        except KeyError:
+            pass
+        resource = self._match(res)
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[res] = resource
+        return resource
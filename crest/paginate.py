@@ -0,0 +1,77 @@
+"""
+Follow next page links of paginated responses.
+
+Link to next page is taken from `next` link of Link header or from a body part given as
+"next" in "pagination" config of resource or service, for example::
+
+    "pagination": {"next": "links[?rel=next].href", "items": "groups"}
+
+"items" is the body part having items of each page.
+"""
+
+from multiprocessing.pool import ThreadPool
+from urlparse import urljoin
+
+from bodypart import compile_body_part
+
+
+def next_link(r, body, part=None):
+    """
+    URI of page after response `r` having JSON `body` or None if it is the last page.
+    `part` is `BodyPart` of link in body. Link header is used if it is not given
+    """
+    if part is None:
+        link = r.links.get('next', {}).get('url')
+    else:
+        try:
+            link = next(iter(part.values(body)), None)
+        except (KeyError, IndexError, TypeError):
+            link = None
+    return link and urljoin(r.url, link)
+
+
+def page_items(body, part=None):
+    """
+    Items of page `body` in `part` of it. Whole body is one item if `part` is not given
+    and body is not a list
+    """
+    if part is not None:
+        body = part.get(body)
+    return body if isinstance(body, list) else [body]
+
+
+def pages(r, get, next_part=None, max_pages=None, check=None):
+    """
+    Generate (response, JSON body) of pages starting from response `r`. `get` takes URI and
+    returns its response. Next page is requested in background while current one is processed.
+    `check` is called with each response before reading it
+    """
+    pool = ThreadPool(1)
+    try:
+        count, seen = 0, set()
+        while r is not None:
+            if check:
+                check(r)
+            body = r.json()
+            count += 1
+            seen.add(r.url)
+            uri = None if max_pages and count >= max_pages else next_link(r, body, next_part)
+            prefetch = pool.apply_async(get, (uri,)) if uri and uri not in seen else None
+            yield r, body
+            r = prefetch and prefetch.get()
+    finally:
+        pool.terminate()
+
+
+def paginated_items(r, get, config=None, output=None, max_pages=None, check=None):
+    """
+    Generate items of all pages starting from response `r`. Items are in `output` body part
+    of each page if given or in "items" of pagination `config`
+    """
+    config = config or {}
+    next_part = config.get('next') and compile_body_part(config['next'])
+    items = output or config.get('items')
+    items_part = items and compile_body_part(items)
+    for _, body in pages(r, get, next_part, max_pages, check):
+        for item in page_items(body, items_part):
+            yield item
@@ -0,0 +1,71 @@
+"""
+Registry of services installed at ~/.crest
+
+Name, description and resources of every installed service are cached in ~/.crest/.registry.json
+so that listing them does not execute each config. A service's entry is rebuilt when
+modification time of its config changes.
+"""
+
+import json
+import os
+
+from matcher import ResourceMatcher
+
+
+registry_name = '.registry.json'
+
+
+def extract_config_from_file(fname):
+    g = {}
+    execfile(fname, g)
+    return g['config']
+
+
+def describe(config):
+    return {
+        'name': config['name'],
+        'description': config.get('description'),
+        'resources': [{'pattern': pattern,
+                       'help': resource.get('help'),
+                       'priority': resource.get('priority', 0),
+                       'templates': sorted(resource.get('templates', {}))}
+                      for pattern, resource in config['resources'].items()]
+    }
+
+
+def load_registry(home):
+    """
+    Return {service directory name: description} of all services installed at `home`
+    """
+    path = os.path.join(home, registry_name)
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (IOError, ValueError):
+        cached = {}
+    registry = {}
+    for name in os.listdir(home):
+        config_path = os.path.join(home, name, 'config.py')
+        try:
+            mtime = os.path.getmtime(config_path)
+        except OSError:
+            continue
+        entry = cached.get(name)
+        if not entry or entry['mtime'] != mtime:
+            entry = describe(extract_config_from_file(config_path))
+            entry['mtime'] = mtime
+        registry[name] = entry
+    if registry != cached:
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(registry, f)
+        os.rename(tmp_path, path)
+    return registry
+
+
+def find_resource(entry, res):
+    """
+    Return description of resource in registry `entry` that matches `res`
+    """
+    matcher = ResourceMatcher([(resource['pattern'], resource) for resource in entry['resources']])
+    return matcher.match(res)
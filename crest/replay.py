@@ -0,0 +1,164 @@
+"""
+Replay requests from history in original order, optionally at original pace or concurrently,
+and compare their responses' status and latency with those of the original requests
+"""
+
+from __future__ import division, print_function
+
+import copy
+import time
+from urlparse import urlparse
+
+import requests
+
+from bench import Histogram
+from engine import close_pool, make_pool, run_request
+
+
+def parse_range(value):
+    """
+    (first, last) history indexes of N (last N requests) or A-B (requests A to B)
+    """
+    first, sep, last = value.partition('-')
+    try:
+        if not sep:
+            return 1, int(first)
+        first, last = int(first), int(last)
+    except ValueError:
+        raise ValueError('Invalid replay range {!r}. Use N or A-B'.format(value))
+    return min(first, last), max(first, last)
+
+
+def replay_items(history, args):
+    """
+    Items of `history` in --replay range matching history search options, oldest first
+    """
+    indexes = parse_range(args.replay) if args.replay else None
+    items = history.search(args.method, args.history_search, args.since, args.until,
+                           args.status, args.body, args.body_key, include_body=True,
+                           indexes=indexes)
+    return list(items)[::-1]
+
+
+def item_args(args, item):
+    """
+    Arguments to send request of history `item` as per replay `args`
+    """
+    args = copy.copy(args)
+    resource = item.resource
+    if resource.startswith('http') and args.uriprefix:
+        # Request sent without service goes to --uriprefix with same path
+        parsed = urlparse(resource)
+        resource = args.uriprefix.rstrip('/') + parsed.path + (
+            '?' + parsed.query if parsed.query else '')
+        args.uriprefix = None
+    setattr(args, 'resource/uri', resource)
+    args.method = item.method
+    args.data = item.body
+    args.replay = args.history_search = None
+    args.last = 0
+    return args
+
+
+class Result(object):
+    """
+    Replay of history `item`
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self.status = None
+        self.elapsed = None
+        self.error = None
+
+    @property
+    def changed(self):
+        """
+        Whether status is different from original one if it is known
+        """
+        return self.item.status is not None and self.status != self.item.status
+
+    def printable(self):
+        item = self.item
+        return '{:<6}{:<8}{:<5}{:<5}{:<2}{:>10}{:>10}  {}'.format(
+            item.index, item.method, item.status or '-', self.status or '-',
+            '!' if self.changed else '',
+            _ms(item.elapsed), _ms(self.elapsed), self.error or item.resource)
+
+
+def _ms(seconds):
+    return '-' if seconds is None else '{:.1f}ms'.format(seconds * 1000)
+
+
+def replay_item(args, session, item):
+    replay = Result(item)
+
+    def handle(r, args):
+        # Body is read to reuse the connection
+        r.content
+        return r.elapsed.total_seconds()
+
+    result = run_request(item_args(args, item), session, handle, store=False)
+    replay.status, replay.elapsed, replay.error = result.status, result.value, result.error
+    if result.error is None and result.status is None:
+        replay.error = 'No response'
+    return replay
+
+
+def summary(results, elapsed):
+    original, replayed = Histogram(), Histogram()
+    for result in results:
+        if result.item.elapsed is not None and result.elapsed is not None:
+            original.record(int(result.item.elapsed * 1000000))
+            replayed.record(int(result.elapsed * 1000000))
+    lines = ['Replayed {} requests in {:.2f}s: {} status changed, {} errors'.format(
+        len(results), elapsed, sum(result.changed for result in results),
+        sum(result.error is not None for result in results))]
+    if original.count:
+        for name, histogram in (('original', original), ('replay', replayed)):
+            lines.append('{:<10}'.format(name) + '  '.join(
+                'p{:g} {:.1f}ms'.format(p, histogram.percentile(p) / 1000)
+                for p in (50, 90, 99)))
+    return '\n'.join(lines)
+
+
+def run_replay(history, args, session=None, out=None, clock=time.time, sleep=time.sleep):
+    """
+    Send requests of `history` selected by replay `args` in their original order and print
+    status and latency of each next to the original one. Requests are sent one at a time
+    unless --concurrency is given. With --original-timing FACTOR, each request is started
+    at its original time since first request divided by FACTOR, upto --concurrency (default 32)
+    at a time.
+    Returns number of requests whose status changed
+    """
+    try:
+        items = replay_items(history, args)
+    except ValueError as e:
+        raise SystemExit('Error: ' + str(e))
+    if not items:
+        raise SystemExit('Error: No requests in history to replay')
+    session = session or requests.Session()
+    start = clock()
+    first_created = items[0].created
+    factor = args.original_timing
+
+    def replay(item):
+        if factor:
+            sleep(max(start + (item.created - first_created) / factor - clock(), 0))
+        return replay_item(args, session, item)
+
+    concurrency = args.concurrency or (32 if factor else 1)
+    print('{:<6}{:<8}{:<5}{:<7}{:>10}{:>10}  {}'.format(
+        'index', 'method', 'was', 'now', 'was', 'now', 'resource'), file=out)
+    results = []
+    pool = make_pool(min(concurrency, len(items))) if concurrency > 1 else None
+    try:
+        for result in pool.imap(replay, items) if pool else (replay(item) for item in items):
+            print(result.printable(), file=out)
+            out.flush()
+            results.append(result)
+    finally:
+        if pool:
+            close_pool(pool)
+    print(summary(results, clock() - start), file=out)
+    return sum(result.changed for result in results)
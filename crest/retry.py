@@ -0,0 +1,117 @@
+"""
+Retry of requests failing with statuses like 429 or 503 and client side rate limit.
+
+Retry policy is given in "retry" of resource or service config:
+``{"statuses": [413, 429, 503], "attempts": 5, "backoff": 0.5, "max_backoff": 30}``.
+A failed request is retried after the time given in its response's Retry-After header or
+after random time up to `backoff` seconds doubled for every attempt ("full jitter") capped
+at `max_backoff`. Connection errors and timeouts are retried only for idempotent methods
+since the request may have been processed.
+"""
+
+from __future__ import print_function, division
+
+import random
+import sys
+import threading
+import time
+
+from cache import http_date
+from timing import phase
+
+
+idempotent_methods = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+
+def retry_after(headers, now=None):
+    """
+    Seconds to wait as per Retry-After header given in seconds or HTTP date or None
+    """
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        date = http_date(value)
+        return None if date is None else max(date - (now or time.time()), 0)
+
+
+class Policy(object):
+    """
+    Which failures are retried, how many times and after how long
+    """
+
+    def __init__(self, statuses=(413, 429, 503), attempts=3, backoff=0.5, max_backoff=30):
+        self.statuses = set(statuses)
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt, headers=None):
+        """
+        Seconds to wait before retrying after `attempt` (starting from 1) failed
+        with response `headers`
+        """
+        seconds = retry_after(headers) if headers is not None else None
+        if seconds is None:
+            seconds = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        return seconds
+
+
+def send_with_retry(send, policy, method, sleep=time.sleep, err=None):
+    """
+    Call `send` returning response again as per `policy` while it fails and return last
+    response. Exception of last attempt is raised
+    """
+    import requests
+    retry_errors = (requests.ConnectionError, requests.Timeout)
+    attempt = 1
+    while True:
+        try:
+            r = send()
+        except retry_errors as e:
+            if attempt >= policy.attempts or method.upper() not in idempotent_methods:
+                raise
+            reason, delay = type(e).__name__, policy.delay(attempt)
+        else:
+            if attempt >= policy.attempts or r.status_code not in policy.statuses:
+                return r
+            r.close()
+            reason, delay = r.status_code, policy.delay(attempt, r.headers)
+        print('Retrying after {:.1f}s due to {} (attempt {} of {})'.format(
+            delay, reason, attempt + 1, policy.attempts), file=err or sys.stderr)
+        with phase('retry wait'):
+            sleep(delay)
+        attempt += 1
+
+
+class TokenBucket(object):
+    """
+    Rate limiter allowing `rate` acquisitions per second on average with bursts of upto
+    `burst`. Shared by threads: each waits for its turn
+    """
+
+    def __init__(self, rate, burst=1, clock=time.time, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token waiting till it is available
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.burst)
+            self._updated = now
+            # Tokens go negative to reserve future tokens for threads already waiting
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            with phase('rate limit'):
+                self.sleep(wait)
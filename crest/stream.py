@@ -0,0 +1,213 @@
+"""
+Extract JSON body parts from a response while it is being received.
+
+Only the selected parts are decoded. Everything else is skipped by scanning for strings and
+brackets, so memory used is bounded by the size of the selected parts, not the whole body.
+"""
+
+import jsonlib
+import re
+
+from bodypart import Filter, select
+
+
+_ws_re = re.compile(r'\s*')
+_special_re = re.compile(r'["\[\]{}]')
+_string_end_re = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_scalar_re = re.compile(r'[^\s,\]}]*')
+
+
+class StreamReader(object):
+    """
+    Reads JSON values from chunks of text keeping only unread part of it in memory
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ''
+        self.pos = 0
+        # Start of text being read that must be kept in buffer
+        self.mark = None
+
+    def _fill(self):
+        """
+        Append next chunk to buffer dropping text already read. Returns False at end of stream
+        """
+        for chunk in self.chunks:
+            if chunk:
+                break
+        else:
+            return False
+        start = self.pos if self.mark is None else self.mark
+        self.buf = self.buf[start:] + chunk
+        self.pos -= start
+        if self.mark is not None:
+            self.mark = 0
+        return True
+
+    def _read(self, skip):
+        """
+        Return text of value skipped by `skip`
+        """
+        self.mark = self.pos
+        try:
+            skip()
+            return self.buf[self.mark:self.pos]
+        finally:
+            self.mark = None
+
+    def peek(self):
+        """
+        Skip whitespace and return next character
+        """
+        while True:
+            self.pos = _ws_re.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON')
+
+    def expect(self, chars):
+        c = self.peek()
+        if c not in chars:
+            raise ValueError('Expected one of {!r} but got {!r}'.format(chars, c))
+        self.pos += 1
+        return c
+
+    def _skip_string(self):
+        while True:
+            m = _string_end_re.match(self.buf, self.pos + 1)
+            if m:
+                self.pos = m.end()
+                return
+            if not self._fill():
+                raise ValueError('Unexpected end of JSON')
+
+    def _skip_scalar(self):
+        while True:
+            end = _scalar_re.match(self.buf, self.pos).end()
+            if end < len(self.buf) or not self._fill():
+                self.pos = end
+                return
+
+    def _skip_container(self):
+        depth = 0
+        while True:
+            m = _special_re.search(self.buf, self.pos)
+            if not m:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError('Unexpected end of JSON')
+                continue
+            self.pos = m.start()
+            c = m.group()
+            if c == '"':
+                self._skip_string()
+                continue
+            self.pos += 1
+            depth += 1 if c in '[{' else -1
+            if depth == 0:
+                return
+
+    def skip_value(self):
+        c = self.peek()
+        if c == '"':
+            self._skip_string()
+        elif c in '[{':
+            self._skip_container()
+        else:
+            self._skip_scalar()
+
+    def read_value(self):
+        self.peek()
+        return jsonlib.loads(self._read(self.skip_value))
+
+    def members(self):
+        """
+        Generate keys of object at current position. Each member's value must be read or
+        skipped before getting next key
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise ValueError('Expected object key')
+            key = jsonlib.loads(self._read(self._skip_string))
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def elements(self):
+        """
+        Generate indexes of array at current position. Each element must be read or
+        skipped before getting next index
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.expect(',]') == ']':
+                return
+
+    def select(self, parts):
+        """
+        Generate values selected by parsed body `parts` from value at current position
+        """
+        if not parts:
+            yield self.read_value()
+            return
+        part, rest = parts[0], parts[1:]
+        if isinstance(part, basestring):
+            found = False
+            for key in self.members():
+                if key == part and not found:
+                    found = True
+                    for value in self.select(rest):
+                        yield value
+                else:
+                    self.skip_value()
+            if not found:
+                raise KeyError(part)
+            return
+        if isinstance(part, Filter):
+            for index in self.elements():
+                element = self.read_value()
+                if part.matches(element):
+                    for value in select(element, rest):
+                        yield value
+            return
+        if isinstance(part, slice):
+            start, stop, step = part.start or 0, part.stop, part.step or 1
+        else:
+            start, stop, step = part, part + 1, 1
+        if start < 0 or (stop is not None and stop < 0):
+            # Array's length is required. Read it whole
+            for value in select(self.read_value(), parts):
+                yield value
+            return
+        found = False
+        for index in self.elements():
+            if start <= index and (stop is None or index < stop) and (index - start) % step == 0:
+                found = True
+                for value in self.select(rest):
+                    yield value
+            else:
+                self.skip_value()
+        if not found and not isinstance(part, slice):
+            raise IndexError(part)
+
+
+def stream_body_part(chunks, part, each=False):
+    """
+    Generate values of `part` (a `BodyPart`) from JSON received in `chunks` as soon as they
+    are read. With `each`, elements of the selected array are generated instead
+    """
+    parts = part.parts + ((slice(None),) if each else ())
+    return StreamReader(chunks).select(parts)
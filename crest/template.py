@@ -0,0 +1,99 @@
+"""
+Request body templates compiled once and rendered for every request.
+
+Template body is serialized once with a placeholder in place of each body part replaced
+by -r and split into a skeleton of JSON text and slots. Rendering joins the skeleton with
+JSON of the slot values without copying or walking the body. Value generators like
+``{{seq}}`` in strings of the template are replaced by their next value in every render;
+other ``{{name}}`` text is kept as it is.
+"""
+
+import copy
+import json
+import re
+import threading
+
+from bodypart import compile_body_part
+from generators import Generators, parse
+
+
+_marker = u'\x00{}\x00'
+_marker_re = re.compile(r'"\\u0000(\d+)\\u0000"')
+
+
+def slot_value(text):
+    """
+    -r value as it is put in body: integer if it is one, string otherwise
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+class Skeleton(object):
+    """
+    `body` with `parts` replaced by slots serialized as list of JSON text pieces,
+    slot numbers and (name, arg) of generators
+    """
+
+    def __init__(self, body, parts, indent=4):
+        body = copy.deepcopy(body)
+        for slot, part in enumerate(parts):
+            part.set(body, _marker.format(slot))
+        self.pieces = []
+        for i, piece in enumerate(_marker_re.split(json.dumps(body, indent=indent))):
+            if i % 2:
+                self.pieces.append(int(piece))
+                continue
+            for item in parse(piece, json_text=True):
+                if isinstance(item, tuple) and item[1]:
+                    # Argument is escaped in JSON text
+                    item = item[0], json.loads('"{}"'.format(item[1]))
+                self.pieces.append(item)
+
+    def render(self, values, generators):
+        """
+        JSON with slots filled by `values` and generators by their next value from `generators`
+        """
+        rendered = []
+        for piece in self.pieces:
+            if isinstance(piece, int):
+                rendered.append(json.dumps(values[piece]))
+            elif isinstance(piece, tuple):
+                # Generated value is inside a JSON string
+                rendered.append(json.dumps(generators.value(*piece))[1:-1])
+            else:
+                rendered.append(piece)
+        return ''.join(rendered)
+
+
+class Template(object):
+    """
+    Compiled template body whose parts or their `aliases` can be replaced when rendering.
+    Skeleton for each list of replaced parts is built once. Values of generators in the
+    template are taken from `generators`
+    """
+
+    def __init__(self, body, aliases=None, generators=None):
+        self.body = body
+        self.aliases = aliases
+        self.generators = generators or Generators()
+        self._skeletons = {}
+        self._lock = threading.Lock()
+
+    def skeleton(self, names):
+        with self._lock:
+            skeleton = self._skeletons.get(names)
+            if skeleton is None:
+                parts = [compile_body_part(name, self.aliases) for name in names]
+                skeleton = self._skeletons[names] = Skeleton(self.body, parts)
+            return skeleton
+
+    def render(self, replacements=()):
+        """
+        JSON of body with (name, value) `replacements`
+        """
+        names = tuple(name for name, _ in replacements)
+        values = [slot_value(value) for _, value in replacements]
+        return self.skeleton(names).render(values, self.generators)
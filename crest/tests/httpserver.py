@@ -0,0 +1,42 @@
+"""
+Local HTTP server for tests sending real requests
+"""
+
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Responds to GET with (status, body) of its path in server's `routes`, 404 to other paths
+    or 200 with empty JSON object to every path if there are no routes
+    """
+
+    def do_GET(self):
+        routes = self.server.routes
+        if routes is None:
+            status, body = 200, '{}'
+        else:
+            status, body = routes.get(self.path, (404, '{"error": "missing"}'))
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(test, routes=None):
+    """
+    Start server responding with `routes` (see `Handler`) that is stopped when `test` is
+    cleaned up and return its URI
+    """
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    server.routes = routes
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return 'http://127.0.0.1:{}'.format(server.server_port)
@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+import time
+from unittest import TestCase, main
+
+from requests import Response
+
+from crest.auth import Token, acquire_token, parse_expiry
+
+
+class ParseExpiryTests(TestCase):
+
+    def test_utc(self):
+        self.assertEqual(parse_expiry('2015-10-15T10:20:00.807Z'), 1444904400)
+
+    def test_offset(self):
+        self.assertEqual(parse_expiry('2015-10-15T15:50:00+05:30'), 1444904400)
+
+    def test_epoch(self):
+        self.assertEqual(parse_expiry(1444904400), 1444904400)
+
+
+class TokenTests(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.acquired = []
+
+    def acquire(self, expires=None):
+        self.acquired.append(expires)
+        return 'token{}'.format(len(self.acquired)), expires
+
+    def test_cached(self):
+        token = Token(self.path)
+        self.assertEqual(token.get(self.acquire), 'token1')
+        self.assertEqual(token.get(self.acquire), 'token1')
+        # Another process reads it from disk
+        self.assertEqual(Token(self.path).get(self.acquire), 'token1')
+        self.assertEqual(len(self.acquired), 1)
+
+    def test_expired(self):
+        token = Token(self.path)
+        token.get(lambda: self.acquire(time.time() + 30))
+        self.assertEqual(token.get(self.acquire), 'token2')
+
+    def test_stale(self):
+        token = Token(self.path)
+        token.get(self.acquire)
+        self.assertEqual(token.get(self.acquire, stale='token1'), 'token2')
+        # Token already refreshed by another request is not acquired again
+        self.assertEqual(token.get(self.acquire, stale='token1'), 'token2')
+        self.assertEqual(len(self.acquired), 2)
+
+
+class FakeService(object):
+
+    headers = {}
+
+    def __init__(self, uriprefix):
+        self.uriprefix = uriprefix
+
+    def uri_prefix(self):
+        return self.uriprefix
+
+
+class FakeSession(object):
+
+    def __init__(self, content):
+        self.content = content
+
+    def request(self, method, uri, data=None, headers=None):
+        r = Response()
+        r.status_code = 200
+        r._content = self.content
+        return r
+
+
+class AcquireTokenTests(TestCase):
+
+    auth = {'service': 'id', 'resource': 'tokens', 'token': 'access.token.id',
+            'expires': 'access.token.expires'}
+
+    def acquire(self, content, uriprefix='http://id'):
+        return acquire_token(FakeService(uriprefix), self.auth, FakeSession(content))
+
+    def test_token(self):
+        self.assertEqual(
+            self.acquire('{"access": {"token": {"id": "t", "expires": 1444904400}}}'),
+            ('t', 1444904400))
+
+    def test_invalid_response(self):
+        for content in ('<html>', '{"access": {}}'):
+            with self.assertRaises(SystemExit) as cm:
+                self.acquire(content)
+            self.assertIn('Invalid authentication response', str(cm.exception))
+
+    def test_no_uriprefix(self):
+        with self.assertRaises(SystemExit) as cm:
+            self.acquire('{}', uriprefix=None)
+        self.assertIn('URI prefix of auth service id', str(cm.exception))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+from StringIO import StringIO
+from unittest import TestCase, main
+
+from crest.batch import run_batch
+from crest import cli
+from crest.cli import setup_parser
+from crest.tests.httpserver import serve
+
+
+class RunBatchTests(TestCase):
+
+    def setUp(self):
+        self.out = StringIO()
+        self.err = StringIO()
+
+    def run_lines(self, *lines, **kwargs):
+        return run_batch(setup_parser(), lines, out=self.out, err=self.err, **kwargs)
+
+    def test_line_per_request(self):
+        failures = self.run_lines('http://h/a --print-only', '', '# comment',
+                                  'http://h/b -m post --print-only')
+        self.assertEqual(failures, 0)
+        self.assertEqual(self.out.getvalue(), 'GET http://h/a \nPOST http://h/b \n')
+
+    def test_error_continues(self):
+        failures = self.run_lines('http://h/a --resources', 'http://h/a --print-only')
+        self.assertEqual(failures, 1)
+        self.assertEqual(self.out.getvalue(), '\nGET http://h/a \n')
+        self.assertTrue(self.err.getvalue().startswith('1: '))
+
+    def test_concurrent_in_order(self):
+        lines = ['http://h/{} --print-only'.format(i) for i in range(20)]
+        self.assertEqual(self.run_lines(*lines, concurrency=4), 0)
+        self.assertEqual(self.out.getvalue(),
+                         ''.join('GET http://h/{} \n'.format(i) for i in range(20)))
+
+    def test_as_completed_reports(self):
+        lines = ['http://h/{} --print-only'.format(i) for i in range(5)] + ['h --resources']
+        self.assertEqual(self.run_lines(*lines, concurrency=3, as_completed=True), 1)
+        results = sorted(line.split('\t') for line in self.out.getvalue().splitlines())
+        self.assertEqual([r[0] for r in results], ['1', '2', '3', '4', '5', '6'])
+        self.assertEqual(results[0][1], '-')
+        self.assertEqual(results[0][3], 'GET http://h/0 ')
+        self.assertEqual(results[5][3], '')
+
+    def test_ndjson_line_per_request(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        # History of requests goes to temporary directory
+        self.addCleanup(setattr, cli, 'home', cli.home)
+        cli.home = tmp
+        uri = serve(self, {'/list': (200, '{"items": [{"id": 1}, {"id": 2}]}')})
+        self.assertEqual(self.run_lines(uri + '/list -o items --ndjson', uri + '/list --ndjson'), 0)
+        self.assertEqual(self.out.getvalue().splitlines(),
+                         ['[{"id":1},{"id":2}]', '{"items":[{"id":1},{"id":2}]}'])
+
+
+if __name__ == '__main__':
+    main()
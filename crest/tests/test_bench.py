@@ -0,0 +1,93 @@
+import json
+import random
+from StringIO import StringIO
+from unittest import TestCase, main
+
+from crest.bench import Histogram, bench
+from crest.cli import run_bench, setup_parser
+from crest.tests.httpserver import serve
+
+
+class HistogramTests(TestCase):
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        values = range(1, 100001)
+        random.shuffle(values)
+        for value in values:
+            histogram.record(value)
+        for percent in (50, 90, 99, 99.9):
+            expected = percent * 1000
+            self.assertLessEqual(abs(histogram.percentile(percent) - expected), expected / 64.0)
+        self.assertEqual(histogram.percentile(100), 100000)
+        self.assertEqual((histogram.min, histogram.max), (1, 100000))
+
+    def test_small(self):
+        histogram = Histogram()
+        for value in (3, 5, 7):
+            histogram.record(value)
+        self.assertEqual(histogram.percentile(50), 5)
+        self.assertLessEqual(len(histogram.counts), 3)
+
+
+class BenchTests(TestCase):
+
+    def test_rate(self):
+        now = [0.0]
+        sent = []
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        def send():
+            sent.append(now[0])
+            if len(sent) % 5 == 0:
+                raise IOError()
+            return 200 if len(sent) % 2 else 503, 1, 10
+
+        result = bench(send, 1, rate=20, clock=lambda: now[0], sleep=sleep).as_dict()
+        self.assertEqual(len(sent), 20)
+        self.assertEqual(sent[:3], [0, 0.05, 0.1])
+        self.assertEqual(result['requests'], 20)
+        self.assertEqual(result['statuses'], {'200': 8, '503': 8})
+        self.assertEqual(result['errors'], {'IOError': 4})
+        self.assertEqual(result['bytes_received'], 160)
+
+    def test_fatal(self):
+        def send():
+            raise SystemExit('Error: bad')
+
+        self.assertRaises(SystemExit, bench, send, 1, concurrency=2)
+
+
+class RunBenchTests(TestCase):
+
+    def setUp(self):
+        self.uri = serve(self) + '/obj'
+
+    def run_bench(self, *argv):
+        args = setup_parser().parse_args([self.uri, '--bench', '--duration', '0.2',
+                                          '--bench-json'] + list(argv))
+        out = StringIO()
+        status = run_bench(args, out)
+        return status, json.loads(out.getvalue())
+
+    def test_default_concurrency(self):
+        status, result = self.run_bench()
+        self.assertEqual(status, 0)
+        self.assertEqual(result['errors'], {})
+        self.assertEqual(result['statuses'].keys(), ['200'])
+
+    def test_rate(self):
+        status, result = self.run_bench('--rate', '20', '--concurrency', '2')
+        self.assertEqual(status, 0)
+        self.assertEqual(result['statuses'].keys(), ['200'])
+
+    def test_no_response(self):
+        args = setup_parser().parse_args(['http://127.0.0.1:1/obj', '--bench', '--duration',
+                                          '0.1'])
+        self.assertEqual(run_bench(args, StringIO()), 1)
+
+
+if __name__ == '__main__':
+    main()
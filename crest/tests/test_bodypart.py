@@ -0,0 +1,61 @@
+from unittest import TestCase, main
+
+from crest.bodypart import Filter, compile_body_part
+
+
+class CompileTests(TestCase):
+
+    def test_parts(self):
+        self.assertEqual(compile_body_part('a.b[2].c[-1]').parts, ('a', 'b', 2, 'c', -1))
+
+    def test_slices(self):
+        self.assertEqual(compile_body_part('a[*].b[1:3]').parts,
+                         ('a', slice(None), 'b', slice(1, 3)))
+
+    def test_filter(self):
+        self.assertEqual(compile_body_part('links[?rel=next].href').parts,
+                         ('links', Filter('rel', 'next'), 'href'))
+        self.assertEqual(compile_body_part('a[?id=2]').parts, ('a', Filter('id', 2)))
+
+    def test_cached(self):
+        self.assertIs(compile_body_part('x.y'), compile_body_part('x.y'))
+
+    def test_alias(self):
+        part = compile_body_part('name', {'name': 'group.name'})
+        self.assertIs(part, compile_body_part('group.name'))
+
+
+class GetSetTests(TestCase):
+
+    def setUp(self):
+        self.d = {'groups': [{'id': 'a', 'p': [1, 2]}, {'id': 'b', 'p': [3]}]}
+
+    def test_get(self):
+        self.assertEqual(compile_body_part('groups[1].id').get(self.d), 'b')
+
+    def test_get_many(self):
+        self.assertEqual(compile_body_part('groups[*].id').get(self.d), ['a', 'b'])
+
+    def test_get_nested_many(self):
+        self.assertEqual(compile_body_part('groups[*].p[*]').get(self.d), [1, 2, 3])
+
+    def test_get_slice(self):
+        self.assertEqual(compile_body_part('groups[-1:].id').get(self.d), ['b'])
+
+    def test_get_filter(self):
+        self.assertEqual(compile_body_part('groups[?id=b].p').get(self.d), [[3]])
+
+    def test_set(self):
+        compile_body_part('groups[0].id').set(self.d, 'c')
+        self.assertEqual(self.d['groups'][0]['id'], 'c')
+
+    def test_set_many(self):
+        compile_body_part('groups[*].id').set(self.d, 'c')
+        self.assertEqual([g['id'] for g in self.d['groups']], ['c', 'c'])
+
+    def test_parent_many(self):
+        self.assertRaises(ValueError, compile_body_part('groups[*]').parent, self.d)
+
+
+if __name__ == '__main__':
+    main()
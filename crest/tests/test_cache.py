@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import TestCase, main
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from crest.cache import Cache, lifetime
+
+
+def response(status, content='', **headers):
+    r = Response()
+    r.status_code = status
+    r._content = content
+    r.headers['content-length'] = str(len(content))
+    r.headers.update((name.replace('_', '-'), value) for name, value in headers.items())
+    r.elapsed = timedelta(milliseconds=5)
+    return r
+
+
+class Session(object):
+    """
+    Session returning given responses and remembering request headers
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def request(self, method, uri, headers=None, **kwargs):
+        self.sent.append(headers)
+        return self.responses.pop(0)
+
+
+class LifetimeTests(TestCase):
+
+    def test_max_age(self):
+        self.assertEqual(lifetime(CaseInsensitiveDict({'Cache-Control': 'public, max-age=60'})),
+                         60)
+
+    def test_expires(self):
+        self.assertEqual(lifetime({'date': 'Thu, 15 Oct 2015 10:20:00 GMT',
+                                   'expires': 'Thu, 15 Oct 2015 10:25:00 GMT'}), 300)
+
+    def test_no_store(self):
+        self.assertIsNone(lifetime({'cache-control': 'no-store'}, ttl=10))
+
+    def test_ttl(self):
+        self.assertEqual(lifetime({'cache-control': 'no-cache'}, ttl=10), 10)
+
+
+class CacheTests(TestCase):
+
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.cache = Cache(os.path.join(path, 'cache.db'))
+        self.headers = CaseInsensitiveDict({'accept': 'application/json'})
+
+    def stats(self):
+        return dict(self.cache.stats())
+
+    def test_fresh(self):
+        session = Session(response(200, '{"a": 1}', cache_control='max-age=60'))
+        self.cache.request(session, 'get', 'http://h/a', self.headers)
+        r = self.cache.request(session, 'get', 'http://h/a', self.headers)
+        self.assertEqual(r.json(), {'a': 1})
+        self.assertEqual(len(session.sent), 1)
+        self.assertEqual(self.stats()['hits'], 1)
+        self.assertEqual(self.stats()['bytes saved'], 8)
+
+    def test_revalidate(self):
+        session = Session(response(200, '{"a": 1}', etag='"v1"'), response(304))
+        self.cache.request(session, 'get', 'http://h/a', self.headers)
+        r = self.cache.request(session, 'get', 'http://h/a', self.headers)
+        self.assertEqual((r.status_code, r.json()), (200, {'a': 1}))
+        self.assertEqual(session.sent[1]['If-None-Match'], '"v1"')
+        self.assertEqual(self.stats()['revalidations'], 1)
+
+    def test_ttl(self):
+        session = Session(response(200, '{}'))
+        self.cache.request(session, 'get', 'http://h/a', self.headers, ttl=60)
+        self.cache.request(session, 'get', 'http://h/a', self.headers, ttl=60)
+        self.assertEqual(len(session.sent), 1)
+
+    def test_vary(self):
+        session = Session(response(200, '1', cache_control='max-age=60', vary='Accept'),
+                          response(200, '2', cache_control='max-age=60', vary='Accept'))
+        self.cache.request(session, 'get', 'http://h/a', self.headers)
+        r = self.cache.request(session, 'get', 'http://h/a', CaseInsensitiveDict({'accept': 'x'}))
+        self.assertEqual(r.content, '2')
+        self.assertEqual(self.cache.request(session, 'get', 'http://h/a', self.headers).content, '1')
+
+    def test_invalidate(self):
+        session = Session(response(200, '1', cache_control='max-age=60'), response(204),
+                          response(200, '2', cache_control='max-age=60'))
+        self.cache.request(session, 'get', 'http://h/a', self.headers)
+        self.cache.request(session, 'put', 'http://h/a', self.headers)
+        self.assertEqual(self.cache.request(session, 'get', 'http://h/a', self.headers).content, '2')
+
+    def test_evict(self):
+        for name in 'abc':
+            self.cache.request(Session(response(200, name * 100, cache_control='max-age=60')),
+                               'get', 'http://h/' + name, self.headers)
+        # Room for only three responses
+        self.cache.max_size = self.stats()['size']
+        self.cache.lookup('GET', 'http://h/a', self.headers)
+        self.cache.request(Session(response(200, 'd' * 100, cache_control='max-age=60')),
+                           'get', 'http://h/d', self.headers)
+        self.assertIsNotNone(self.cache.lookup('GET', 'http://h/a', self.headers))
+        self.assertIsNone(self.cache.lookup('GET', 'http://h/b', self.headers))
+        self.assertEqual(self.stats()['responses'], 3)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,14 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from StringIO import StringIO
 from unittest import TestCase, main
 
-from crest.cli import extract_body_part, parse_body_part
+from requests import Response
+
+from crest import cli
+from crest.cli import extract_body_part, parse_body_part, update_body_parts
 
 
 class ParseBodyTests(TestCase):
@@ -42,5 +50,80 @@ class ExtractBodyTests(TestCase):
         self.assertEqual(part, 2)
 
 
+class UpdateBodyPartsTests(TestCase):
+
+    def test_aliases(self):
+        body = {'group': {'name': 'a', 'min': 0}}
+        res = {'aliases': {'name': 'group.name'}}
+        update_body_parts(res, body, [('name', 'b'), ('group.min', '3')])
+        self.assertEqual(body, {'group': {'name': 'b', 'min': 3}})
+
+
+class TemplateTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        os.makedirs(os.path.join(tmp, 'svc', 'history'))
+        with open(os.path.join(tmp, 'svc', 'config.py'), 'w') as f:
+            f.write('config = {"resources": {"groups": {"templates": {"default": {"a": [1]}}}}}')
+        self.addCleanup(setattr, cli, 'home', cli.home)
+        cli.home = tmp
+
+    def test_copy(self):
+        service = cli.Service('svc')
+        body = service.get_template_body('groups', 'default')
+        body['a'].append(2)
+        self.assertEqual(service.get_template_body('groups', 'default'), {'a': [1]})
+
+
+class ExpandGeneratorsTests(TestCase):
+
+    def test_opt_in(self):
+        parser = cli.setup_parser()
+        args = parser.parse_args(['http://h/{{seq}}', '-d', '{"msg": "hello {{name}}"}'])
+        self.assertIs(cli.expand_generators(args), args)
+        args = cli.expand_generators(parser.parse_args(
+            ['http://h/{{uuid}}', '-d', '{"msg": "hello {{name}}"}', '--generators']))
+        self.assertNotIn('{{', getattr(args, 'resource/uri'))
+        self.assertEqual(args.data, '{"msg": "hello {{name}}"}')
+
+
+class PrintResponseTests(TestCase):
+
+    body = '{"servers": [{"id": 1}, {"id": 2}]}'
+
+    def print_response(self, fmt, output=None):
+        r = Response()
+        r.status_code = 200
+        r.raw = BytesIO(self.body)
+        out = StringIO()
+        cli.print_response(r, output, out, fmt=fmt)
+        return out.getvalue()
+
+    def test_compact(self):
+        self.assertEqual(self.print_response('compact'), '{"servers":[{"id":1},{"id":2}]}\n')
+
+    def test_ndjson(self):
+        self.assertEqual(self.print_response('ndjson', 'servers'), '{"id":1}\n{"id":2}\n')
+
+    def test_raw(self):
+        self.assertEqual(self.print_response('raw'), self.body + '\n')
+        self.assertEqual(self.print_response('raw', 'servers[1].id'), '2\n')
+
+    def test_missing_part(self):
+        for fmt, output in (('ndjson', None), ('ndjson', 'servers.x'), ('pretty', 'x'),
+                            ('compact', 'servers[5]')):
+            with self.assertRaises(SystemExit) as cm:
+                self.print_response(fmt, output)
+            self.assertTrue(str(cm.exception).startswith('Error: Cannot select'))
+
+    def test_auto(self):
+        args = cli.setup_parser().parse_args(['http://h/a', '--format', 'auto'])
+        self.assertEqual(cli.output_format(args, StringIO()), 'raw')
+        args.output = 'servers'
+        self.assertEqual(cli.output_format(args, StringIO()), 'compact')
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,38 @@
+import gzip
+import zlib
+from io import BytesIO
+from unittest import TestCase, main
+
+from crest.compression import compress, compress_body
+
+
+class CompressTests(TestCase):
+
+    data = '{"servers": [' + ', '.join(['{"name": "webhead"}'] * 100) + ']}'
+
+    def test_gzip(self):
+        compressed = compress(self.data, 'gzip')
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(compressed)).read(), self.data)
+        # Same content gives same body
+        self.assertEqual(compress(self.data, 'gzip'), compressed)
+
+    def test_deflate(self):
+        self.assertEqual(zlib.decompress(compress(unicode(self.data), 'deflate', 9)), self.data)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, compress, self.data, 'lzma')
+
+    def test_body(self):
+        headers = {}
+        body = compress_body(self.data, 'gzip', headers)
+        self.assertLess(len(body), len(self.data))
+        self.assertEqual(headers, {'Content-Encoding': 'gzip'})
+
+    def test_small_body(self):
+        headers = {}
+        self.assertEqual(compress_body('{"a": 1}', 'gzip', headers), '{"a": 1}')
+        self.assertEqual(headers, {})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import threading
+from StringIO import StringIO
+from unittest import TestCase, main
+
+from crest.cli import setup_parser
+from crest.client import forward, local_only
+from crest.daemon import Daemon
+
+
+class LocalOnlyTests(TestCase):
+
+    def test_forwarded(self):
+        self.assertFalse(local_only(['-s', 'svc', 'groups', '-o', 'groups']))
+
+    def test_local(self):
+        self.assertTrue(local_only(['groups', '-e']))
+        self.assertTrue(local_only(['--daemon']))
+        self.assertTrue(local_only(['--batch', 'reqs.txt', '--gevent']))
+        self.assertTrue(local_only(['--batch', '-']))
+
+    def test_long_running(self):
+        self.assertTrue(local_only(['--batch', 'reqs.txt']))
+        self.assertTrue(local_only(['groups', '--wait-until=state == "ACTIVE"']))
+        self.assertTrue(local_only(['groups', '--bench', '--duration', '5']))
+        self.assertTrue(local_only(['--replay', '5']))
+
+
+class DaemonTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.path = os.path.join(tmp, 'sock')
+        self.daemon = Daemon(self.path, setup_parser())
+        thread = threading.Thread(target=self.daemon.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.daemon.server_close)
+        self.addCleanup(self.daemon.shutdown)
+
+    def forward(self, *argv):
+        out, err = StringIO(), StringIO()
+        return forward(list(argv), out, err, self.path), out.getvalue(), err.getvalue()
+
+    def test_output(self):
+        self.assertEqual(self.forward('http://h/a', '-m', 'post', '--print-only'),
+                         (0, 'POST http://h/a \n', ''))
+
+    def test_error(self):
+        self.assertEqual(self.forward('http://h/a', '--resources'),
+                         (1, '', 'Error: Required --service argument not given\n'))
+
+    def test_not_running(self):
+        self.assertIsNone(forward(['a'], path=self.path + 'x'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+from StringIO import StringIO
+from unittest import TestCase, main
+
+from crest.endpoints import group_outputs, print_results, select_endpoints
+from crest.engine import Result
+
+
+class FakeService(object):
+
+    def endpoints(self):
+        return {'ord': 'http://ord', 'dfw': 'http://dfw', 'iad': None}
+
+
+class SelectEndpointsTests(TestCase):
+
+    def test_all_sorted(self):
+        self.assertEqual(select_endpoints(FakeService()).keys(), ['dfw', 'iad', 'ord'])
+
+    def test_given_order(self):
+        self.assertEqual(select_endpoints(FakeService(), ['ord', 'dfw']).items(),
+                         [('ord', 'http://ord'), ('dfw', 'http://dfw')])
+
+    def test_unknown(self):
+        with self.assertRaises(SystemExit) as cm:
+            select_endpoints(FakeService(), ['ord', 'syd'])
+        self.assertIn('syd', str(cm.exception))
+
+
+class PrintResultsTests(TestCase):
+
+    results = [('dfw', Result(None, 200, 0.1, '1\n', None)),
+               ('iad', Result(None, 200, 0.2, '2\n', None)),
+               ('ord', Result(None, 200, 0.3, '1\n', None))]
+
+    def test_group(self):
+        self.assertEqual(group_outputs(self.results), [(['dfw', 'ord'], '1\n'), (['iad'], '2\n')])
+
+    def test_diff(self):
+        out = StringIO()
+        print_results(self.results, out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'dfw            200        100.0 ms')
+        self.assertEqual(lines[4:7], ['== dfw, ord', '1', ''])
+        self.assertIn('-1', lines)
+        self.assertIn('+2', lines)
+
+    def test_same(self):
+        out = StringIO()
+        print_results(self.results[:1], out)
+        self.assertTrue(out.getvalue().endswith('\nSame output from all endpoints:\n1\n'))
+
+
+if __name__ == '__main__':
+    main()
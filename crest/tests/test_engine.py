@@ -0,0 +1,62 @@
+from multiprocessing.pool import ThreadPool
+from unittest import TestCase, main
+
+from crest.engine import Engine, make_pool
+from crest.tests.httpserver import serve
+
+
+class EngineTests(TestCase):
+
+    def setUp(self):
+        self.uri = serve(self, {'/group': (200, '{"id": "g1", "state": {"active": 2}}'),
+                                '/text': (200, 'ok'),
+                                '/empty': (204, '')})
+        self.engine = Engine(concurrency=4, store=False)
+
+    def test_send(self):
+        result = self.engine.send('{}/group -o state.active'.format(self.uri))
+        self.assertEqual((result.status, result.value, result.error), (200, 2, None))
+        result = self.engine.send(['{}/group'.format(self.uri)])
+        self.assertEqual(result.value['id'], 'g1')
+
+    def test_not_json(self):
+        self.assertEqual(self.engine.send('{}/text'.format(self.uri)).value, 'ok')
+        self.assertIsNone(self.engine.send('{}/empty'.format(self.uri)).value)
+
+    def test_failure(self):
+        result = self.engine.send('{}/missing'.format(self.uri))
+        self.assertEqual(result.status, 404)
+        self.assertIn('missing', result.error)
+
+    def test_wait_until(self):
+        result = self.engine.send('{}/group --wait-until "state.active == 5" --wait-timeout 0.2 '
+                                  '--wait-interval 0.1'.format(self.uri))
+        self.assertIn('did not hold', result.error)
+
+    def test_paginate_rejected(self):
+        result = self.engine.send('{}/group --paginate'.format(self.uri))
+        self.assertIn('--paginate', result.error)
+        self.assertIsNone(result.status)
+
+    def test_map(self):
+        argvs = ['{}/{}'.format(self.uri, path) for path in ('group', 'missing', 'text') * 3]
+        results = list(self.engine.map(argvs))
+        self.assertEqual([result.argv for result in results], argvs)
+        self.assertEqual([result.status for result in results], [200, 404, 200] * 3)
+
+    def test_as_completed(self):
+        argvs = ['{}/group -o id'.format(self.uri)] * 10
+        results = list(self.engine.as_completed(argvs))
+        self.assertEqual([result.value for result in results], ['g1'] * 10)
+
+
+class MakePoolTests(TestCase):
+
+    def test_threads_without_gevent(self):
+        pool = make_pool(2)
+        self.addCleanup(pool.terminate)
+        self.assertIsInstance(pool, ThreadPool)
+
+
+if __name__ == '__main__':
+    main()
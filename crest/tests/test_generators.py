@@ -0,0 +1,35 @@
+import re
+from unittest import TestCase, main
+
+from crest.generators import Generators
+
+
+class GeneratorsTests(TestCase):
+
+    def setUp(self):
+        self.generators = Generators()
+
+    def test_seq(self):
+        self.assertEqual(self.generators.expand('g{{seq}}'), 'g1')
+        self.assertEqual(self.generators.expand('g{{seq}}-{{seq}}'), 'g2-3')
+
+    def test_random(self):
+        value = int(self.generators.expand('{{rand:5-7}}'))
+        self.assertTrue(5 <= value <= 7)
+        self.assertIn(self.generators.expand('{{choice:a,b}}'), ['a', 'b'])
+        self.assertTrue(re.match('^[0-9a-f-]{36}$', self.generators.expand('{{uuid}}')))
+
+    def test_none(self):
+        self.assertEqual(self.generators.expand('groups/{x}'), 'groups/{x}')
+        self.assertIsNone(self.generators.expand(None))
+
+    def test_unknown_kept(self):
+        self.assertEqual(self.generators.expand('hello {{name}} {{seq}}'), 'hello {{name}} 1')
+        self.assertRaises(ValueError, self.generators.value, 'foo')
+
+    def test_escaped(self):
+        self.assertEqual(self.generators.expand(r'\{{seq}} {{seq}}'), '{{seq}} 1')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO
+from unittest import TestCase, main
+
+from requests import Response
+
+from crest.history import History, HistoryItem
+
+
+def response(status, content=''):
+    r = Response()
+    r.status_code = status
+    r._content = content
+    r.headers['content-length'] = str(len(content))
+    r.elapsed = timedelta(milliseconds=5)
+    return r
+
+
+class HistoryTests(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.history = History(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_empty(self):
+        self.assertEqual(list(self.history.items()), [])
+
+    def test_store_get(self):
+        self.history.store_item('POST', 'groups', '{"a": 1}')
+        self.history.store_item('GET', 'groups/1', None)
+        self.assertEqual(self.history[1], HistoryItem('GET', 'groups/1'))
+        self.assertEqual(self.history[2], HistoryItem('POST', 'groups', body='{"a": 1}'))
+        self.assertRaises(IndexError, self.history.__getitem__, 3)
+
+    def test_dedupe_last(self):
+        for _ in range(3):
+            self.history.store_item('POST', 'groups', '{"a": 1}')
+        self.assertEqual(len(list(self.history.items())), 1)
+
+    def test_items_pages(self):
+        for i in range(25):
+            self.history.store_item('GET', 'r{}'.format(i), None)
+        items = list(self.history.items(False, page_size=10))
+        self.assertEqual([item.index for item in items], range(1, 26))
+        self.assertEqual(items[0].resource, 'r24')
+        self.assertEqual(items[-1].resource, 'r0')
+
+    def test_migrate(self):
+        old = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, old)
+        for i, content in enumerate(['GET\nr1\n', 'POST\nr2\n{\n "a": 1\n}\n'], 1):
+            with open(os.path.join(old, '{:0=5d}'.format(i)), 'w') as f:
+                f.write(content)
+        with open(os.path.join(old, 'HEAD'), 'w') as f:
+            f.write('00002')
+        mtimes = [os.path.getmtime(os.path.join(old, name)) for name in ('00002', '00001')]
+        history = History(old)
+        self.assertEqual(list(history.items()),
+                         [HistoryItem('POST', 'r2', body='{\n "a": 1\n}', index=1,
+                                      created=mtimes[0]),
+                          HistoryItem('GET', 'r1', index=2, created=mtimes[1])])
+
+
+class ResponseTests(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.history = History(self.path)
+        self.id = self.history.store_item('GET', 'groups', None)
+
+    def test_latest_in_items(self):
+        self.history.store_response(self.id, response(500, 'oops'))
+        self.history.store_response(self.id, response(200, '[]'))
+        item = next(self.history.items())
+        self.assertEqual((item.status, item.elapsed, item.size), (200, 0.005, 2))
+        self.assertIn('200', item.printable())
+
+    def test_record_body(self):
+        self.history.store_response(self.id, response(200, '[1]'))
+        self.history.store_response(self.id, response(200, '[2]'), record_body=True)
+        responses = list(self.history.responses(1))
+        self.assertEqual([r.body for r in responses], ['[2]', None])
+        self.assertEqual(responses[0].headers, {'content-length': '3'})
+
+    def test_body_stored_once(self):
+        for _ in range(3):
+            self.history.store_response(self.id, response(200, '[1]'), record_body=True)
+        self.assertEqual(self.history._query('SELECT count(*) FROM bodies'), [(1,)])
+        self.assertEqual([r.body for r in self.history.responses(1)], ['[1]'] * 3)
+
+    def test_large_body_not_recorded(self):
+        self.history.max_body_size = 2
+        self.history.store_response(self.id, response(200, '[11]'), record_body=True)
+        r = next(self.history.responses(1))
+        self.assertEqual((r.body, r.size), (None, 4))
+
+    def streamed(self, content):
+        r = response(200)
+        del r.headers['content-length']
+        r._content = False
+        r.raw = BytesIO(content)
+        self.history.store_response(self.id, r, record_body=True)
+        return r
+
+    def test_streamed_body_recorded_when_read(self):
+        r = self.streamed('[1, 2]')
+        self.assertIsNone(next(self.history.responses(1)).body)
+        self.assertEqual(''.join(r.iter_content(2)), '[1, 2]')
+        self.assertEqual(next(self.history.responses(1)).body, '[1, 2]')
+
+    def test_streamed_large_body_not_recorded(self):
+        self.history.max_body_size = 2
+        r = self.streamed('[11]')
+        self.assertEqual(r.content, '[11]')
+        self.assertIsNone(next(self.history.responses(1)).body)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.history = History(self.path)
+        self.history.store_item('POST', 'groups', '{"group": {"name": "web heads"}}')
+        _id = self.history.store_item('GET', 'groups/1/policies/2', None)
+        self.history.store_response(_id, response(404))
+        self.history.store_item('GET', 'groups/1', None)
+
+    def search(self, **kwargs):
+        return [(item.index, item.resource) for item in self.history.search(**kwargs)]
+
+    def test_all(self):
+        self.assertEqual([r[0] for r in self.search()], [1, 2, 3])
+
+    def test_method(self):
+        self.assertEqual(self.search(method='post'), [(3, 'groups')])
+
+    def test_resource(self):
+        self.assertEqual(self.search(resource='groups/1/policies/'), [(2, 'groups/1/policies/2')])
+        self.assertEqual(self.search(resource='^groups/?$'), [(3, 'groups')])
+        self.assertEqual(self.search(resource='s/1/p|^groups$'),
+                         [(2, 'groups/1/policies/2'), (3, 'groups')])
+
+    def test_resource_optional_segment(self):
+        self.history.store_item('GET', 'groups/abcx', None)
+        self.assertEqual(self.search(resource='groups/abc/?x'), [(1, 'groups/abcx')])
+
+    def test_status(self):
+        self.assertEqual(self.search(status=404), [(2, 'groups/1/policies/2')])
+
+    def test_time(self):
+        self.assertEqual(len(self.search(since=time.time() - 60)), 3)
+        self.assertEqual(self.search(until=time.time() - 60), [])
+
+    def test_body(self):
+        self.assertEqual(self.search(body='Heads web'), [(3, 'groups')])
+        self.assertEqual(self.search(body='web head'), [])
+        self.assertEqual(self.search(body_key='NAME'), [(3, 'groups')])
+
+    def test_indexes(self):
+        self.assertEqual(self.search(indexes=(2, 3)), [(2, 'groups/1/policies/2'), (3, 'groups')])
+        self.assertEqual(self.search(indexes=(1, 1), method='post'), [])
+
+    def test_include_body(self):
+        items = self.history.search(resource='^groups$', include_body=True)
+        self.assertEqual([item.body for item in items], ['{"group": {"name": "web heads"}}'])
+
+
+if __name__ == '__main__':
+    main()
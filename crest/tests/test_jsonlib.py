@@ -0,0 +1,25 @@
+from unittest import TestCase, main
+
+from crest.jsonlib import backends, load_backend
+
+
+class BackendTests(TestCase):
+
+    def test_same_output(self):
+        obj = {'a': [1, 0.1, None, True, u'\xe9/']}
+        for name in backends:
+            try:
+                backend = load_backend(name)
+            except ImportError:
+                continue
+            self.assertEqual(backend.dumps(obj), '{"a":[1,0.1,null,true,"\\u00e9/"]}', name)
+            self.assertEqual(backend.dumps({'a': [1, 2]}, 2), '{\n  "a": [\n    1,\n    2\n  ]\n}',
+                             name)
+            self.assertRaises(ValueError, backend.loads, '{"a":')
+
+    def test_fallback(self):
+        self.assertIn(load_backend().name, backends)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+from unittest import TestCase, main
+
+from crest.matcher import ResourceMatcher
+
+
+class ResourceMatcherTests(TestCase):
+
+    def setUp(self):
+        self.resources = {
+            'groups/?$': {'id': 'groups'},
+            'groups/[\\w\\-]+/?$': {'id': 'group'},
+            'groups/[\\w\\-]+/policies/?$': {'id': 'policies'},
+            'policies': {'id': 'any policies'},
+        }
+
+    def match(self, res, resources=None):
+        resource = ResourceMatcher((resources or self.resources).items()).match(res)
+        return resource and resource['id']
+
+    def test_match(self):
+        self.assertEqual(self.match('groups'), 'groups')
+        self.assertEqual(self.match('Groups/ab-1/'), 'group')
+        self.assertEqual(self.match('v1/groups/ab/policies'), 'policies')
+        self.assertIsNone(self.match('servers'))
+
+    def test_longer_pattern_first(self):
+        self.assertEqual(self.match('groups/ab/policies'), 'policies')
+
+    def test_priority(self):
+        self.resources['policies']['priority'] = 1
+        self.assertEqual(self.match('groups/ab/policies'), 'any policies')
+
+    def test_many_patterns_with_groups(self):
+        resources = {'r(e)s{}$'.format(i): {'id': i} for i in range(200)}
+        self.assertEqual(self.match('res150', resources), 150)
+        self.assertEqual(self.match('res7', resources), 7)
+
+    def test_cached(self):
+        matcher = ResourceMatcher(self.resources.items())
+        self.assertIs(matcher.match('groups'), matcher.match('groups'))
+        self.assertIn('groups', matcher._cache)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import json
+from unittest import TestCase, main
+
+from requests import Response
+
+from crest.paginate import paginated_items
+
+
+def page(url, items, next_url=None, link=False):
+    r = Response()
+    r.status_code = 200
+    r.url = url
+    body = {'items': items, 'links': []}
+    if next_url and link:
+        r.headers['Link'] = '<{}>; rel="next"'.format(next_url)
+    elif next_url:
+        body['links'].append({'rel': 'next', 'href': next_url})
+    r._content = json.dumps(body)
+    return r
+
+
+class PaginatedItemsTests(TestCase):
+
+    def setUp(self):
+        self.pages = {
+            'http://h/items?page=2': page('http://h/items?page=2', [3], '/items?page=3'),
+            'http://h/items?page=3': page('http://h/items?page=3', [4, 5])
+        }
+        self.requested = []
+
+    def get(self, uri):
+        self.requested.append(uri)
+        return self.pages[uri]
+
+    def test_body_link(self):
+        first = page('http://h/items', [1, 2], 'items?page=2')
+        config = {'next': 'links[?rel=next].href', 'items': 'items'}
+        self.assertEqual(list(paginated_items(first, self.get, config)), [1, 2, 3, 4, 5])
+        self.assertEqual(self.requested, ['http://h/items?page=2', 'http://h/items?page=3'])
+
+    def test_link_header(self):
+        first = page('http://h/items', [1, 2], 'http://h/items?page=2', link=True)
+        self.assertEqual(list(paginated_items(first, self.get, output='items')), [1, 2, 3])
+
+    def test_max_pages(self):
+        first = page('http://h/items', [1, 2], '/items?page=2')
+        config = {'next': 'links[?rel=next].href'}
+        items = list(paginated_items(first, self.get, config, 'items[*]', max_pages=2))
+        self.assertEqual(items, [1, 2, 3])
+        self.assertEqual(self.requested, ['http://h/items?page=2'])
+
+    def test_check(self):
+        first = page('http://h/items', [1], '/items?page=2')
+        checked = []
+        list(paginated_items(first, self.get, {'next': 'links[?rel=next].href'},
+                             check=lambda r: checked.append(r.url)))
+        self.assertEqual(checked, ['http://h/items', 'http://h/items?page=2',
+                                   'http://h/items?page=3'])
+
+
+if __name__ == '__main__':
+    main()
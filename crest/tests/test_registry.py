@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from crest.registry import find_resource, load_registry
+
+
+config = '''
+config = {
+    "name": "svc",
+    "description": "%s",
+    "resources": {
+        "groups/?$": {"templates": {"default": {}, "big": {}}, "help": "Groups"},
+        "groups/\\w+/?$": {"help": "Group"}
+    }
+}
+'''
+
+
+class RegistryTests(TestCase):
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.home)
+        os.makedirs(os.path.join(self.home, 'svc'))
+        os.makedirs(os.path.join(self.home, 'generic_history'))
+        self.write_config('Service')
+
+    def write_config(self, description, mtime=1000):
+        path = os.path.join(self.home, 'svc', 'config.py')
+        with open(path, 'w') as f:
+            f.write(config % description)
+        os.utime(path, (mtime, mtime))
+
+    def test_load(self):
+        registry = load_registry(self.home)
+        self.assertEqual(registry.keys(), ['svc'])
+        self.assertEqual(registry['svc']['description'], 'Service')
+        self.assertEqual(find_resource(registry['svc'], 'groups')['templates'], ['big', 'default'])
+        self.assertEqual(find_resource(registry['svc'], 'groups/ab')['help'], 'Group')
+
+    def test_cached(self):
+        load_registry(self.home)
+        # Broken config is not executed since it has not changed
+        path = os.path.join(self.home, 'svc', 'config.py')
+        with open(path, 'w') as f:
+            f.write('raise Exception()')
+        os.utime(path, (1000, 1000))
+        self.assertEqual(load_registry(self.home)['svc']['description'], 'Service')
+
+    def test_invalidated_by_mtime(self):
+        load_registry(self.home)
+        self.write_config('Changed', mtime=2000)
+        self.assertEqual(load_registry(self.home)['svc']['description'], 'Changed')
+
+
+if __name__ == '__main__':
+    main()
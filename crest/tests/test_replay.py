@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+from unittest import TestCase, main
+
+from crest.cli import setup_parser
+from crest.history import History, HistoryItem
+from crest.replay import Result, item_args, parse_range, replay_items
+
+
+class ParseRangeTests(TestCase):
+
+    def test_last(self):
+        self.assertEqual(parse_range('5'), (1, 5))
+
+    def test_range(self):
+        self.assertEqual(parse_range('8-3'), (3, 8))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_range, '3-')
+
+
+class ReplayItemsTests(TestCase):
+
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.history = History(path)
+        for i in range(5):
+            self.history.store_item('POST' if i % 2 else 'GET', 'groups/{}'.format(i), str(i))
+
+    def items(self, *argv):
+        args = setup_parser().parse_args(list(argv))
+        return [(item.index, item.body) for item in replay_items(self.history, args)]
+
+    def test_oldest_first(self):
+        self.assertEqual(self.items('--replay', '3'), [(3, '2'), (2, '3'), (1, '4')])
+        self.assertEqual(self.items('--replay', '2-4'), [(4, '1'), (3, '2'), (2, '3')])
+
+    def test_filtered(self):
+        self.assertEqual(self.items('--replay', '-m', 'post'), [(4, '1'), (2, '3')])
+
+
+class ItemArgsTests(TestCase):
+
+    def test_uriprefix(self):
+        args = setup_parser().parse_args(['--replay', '--uriprefix', 'http://staging/'])
+        args = item_args(args, HistoryItem('PUT', 'https://prod:8443/v1/a?x=1', body='{}'))
+        self.assertEqual((getattr(args, 'resource/uri'), args.method, args.data, args.uriprefix),
+                         ('http://staging/v1/a?x=1', 'PUT', '{}', None))
+
+    def test_changed(self):
+        result = Result(HistoryItem('GET', 'a', status=200))
+        result.status = 503
+        self.assertTrue(result.changed)
+        self.assertFalse(Result(HistoryItem('GET', 'a')).changed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+from io import BytesIO
+from unittest import TestCase, main
+
+import requests
+from requests import Response
+
+from crest.retry import Policy, TokenBucket, retry_after, send_with_retry
+
+
+def response(status, **headers):
+    r = Response()
+    r.status_code = status
+    r.raw = BytesIO()
+    r.headers.update(headers)
+    return r
+
+
+class Null(object):
+
+    def write(self, text):
+        pass
+
+
+class RetryAfterTests(TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(retry_after({'retry-after': '3'}), 3)
+
+    def test_date(self):
+        self.assertEqual(retry_after({'retry-after': 'Thu, 01 Jan 1970 00:01:00 GMT'}, now=50), 10)
+
+    def test_missing(self):
+        self.assertIsNone(retry_after({}))
+
+
+class SendWithRetryTests(TestCase):
+
+    def setUp(self):
+        self.slept = []
+
+    def send(self, responses, method='GET', policy=None):
+        responses = list(responses)
+
+        def send():
+            r = responses.pop(0)
+            if isinstance(r, Exception):
+                raise r
+            return r
+
+        return send_with_retry(send, policy or Policy(attempts=3), method, self.slept.append,
+                               Null())
+
+    def test_retry_after(self):
+        r = self.send([response(429, **{'Retry-After': '2'}), response(503), response(200)])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.slept[0], 2)
+        self.assertTrue(0 <= self.slept[1] <= 1)
+
+    def test_gives_up(self):
+        r = self.send([response(503)] * 3)
+        self.assertEqual((r.status_code, len(self.slept)), (503, 2))
+
+    def test_not_retried(self):
+        self.assertEqual(self.send([response(500)]).status_code, 500)
+        self.assertEqual(self.slept, [])
+
+    def test_connection_error(self):
+        r = self.send([requests.ConnectionError(), response(200)])
+        self.assertEqual(r.status_code, 200)
+        self.assertRaises(requests.ConnectionError, self.send,
+                          [requests.ConnectionError(), response(200)], 'POST')
+
+    def test_backoff_capped(self):
+        policy = Policy(backoff=1, max_backoff=3)
+        self.assertTrue(all(policy.delay(10) <= 3 for _ in range(20)))
+
+
+class TokenBucketTests(TestCase):
+
+    def test_waits_in_turn(self):
+        now = [0]
+        slept = []
+        bucket = TokenBucket(2, clock=lambda: now[0], sleep=slept.append)
+        for _ in range(3):
+            bucket.acquire()
+        # Threads reserve later tokens before sleeping for them
+        self.assertEqual(slept, [0.5, 1.0])
+        now[0] = 10
+        bucket.acquire()
+        self.assertEqual(slept, [0.5, 1.0])
+
+
+if __name__ == '__main__':
+    main()
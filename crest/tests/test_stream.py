@@ -0,0 +1,64 @@
+import json
+from unittest import TestCase, main
+
+from crest.bodypart import compile_body_part
+from crest.stream import stream_body_part
+
+
+body = {
+    'servers': [
+        {'id': 'a"b', 'name': 'x\\y', 'flavor': {'id': 2}, 'ips': [1.5, None, True]},
+        {'id': 'c', 'name': u'\xe9', 'flavor': {'id': 3}, 'ips': []},
+        {'id': 'd', 'name': '[{', 'flavor': {}, 'ips': [-10]}
+    ],
+    'links': [],
+    'count': 3
+}
+
+
+class StreamBodyPartTests(TestCase):
+
+    def values(self, name, each=False):
+        """
+        Values of `name` streamed one character at a time and in larger chunks
+        """
+        text = json.dumps(body, indent=2)
+        results = []
+        for size in (1, 7, len(text)):
+            chunks = (text[i:i + size] for i in range(0, len(text), size))
+            results.append(list(stream_body_part(chunks, compile_body_part(name), each)))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+        return results[0]
+
+    def test_whole(self):
+        self.assertEqual(self.values(''), [body])
+
+    def test_scalar(self):
+        self.assertEqual(self.values('count'), [3])
+        self.assertEqual(self.values('servers[1].name'), [u'\xe9'])
+
+    def test_subtree(self):
+        self.assertEqual(self.values('servers[0]'), [body['servers'][0]])
+
+    def test_many(self):
+        self.assertEqual(self.values('servers[*].flavor'), [{'id': 2}, {'id': 3}, {}])
+        self.assertEqual(self.values('servers[1:].id'), ['c', 'd'])
+
+    def test_filter(self):
+        self.assertEqual(self.values('servers[?id=c].flavor.id'), [3])
+
+    def test_negative(self):
+        self.assertEqual(self.values('servers[-1].ips[0]'), [-10])
+
+    def test_each(self):
+        self.assertEqual(self.values('servers[0].ips', each=True), [1.5, None, True])
+        self.assertEqual(self.values('links', each=True), [])
+
+    def test_missing(self):
+        self.assertRaises(KeyError, self.values, 'servers[0].foo')
+        self.assertRaises(IndexError, self.values, 'servers[5]')
+
+
+if __name__ == '__main__':
+    main()
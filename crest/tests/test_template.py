@@ -0,0 +1,43 @@
+import json
+from unittest import TestCase, main
+
+from crest.generators import Generators
+from crest.template import Template
+
+
+class TemplateTests(TestCase):
+
+    body = {'group': {'name': 'g', 'min': 0}, 'policies': [{'change': 1}, {'change': 2}]}
+
+    def test_same_as_updated_body(self):
+        template = Template(self.body, {'name': 'group.name'})
+        rendered = template.render([('name', 'a"b'), ('policies[*].change', '3')])
+        self.assertEqual(json.loads(rendered),
+                         {'group': {'name': 'a"b', 'min': 0},
+                          'policies': [{'change': 3}, {'change': 3}]})
+        self.assertEqual(template.render(), json.dumps(self.body, indent=4))
+        # Template body is not changed
+        self.assertEqual(self.body['group']['name'], 'g')
+
+    def test_skeleton_reused(self):
+        template = Template(self.body)
+        template.render([('group.min', '1')])
+        skeleton = template.skeleton(('group.min',))
+        self.assertEqual(json.loads(template.render([('group.min', '2')]))['group']['min'], 2)
+        self.assertIs(template.skeleton(('group.min',)), skeleton)
+
+    def test_generators(self):
+        template = Template({'name': 'web-{{seq}}', 'id': '{{choice:"a",b}}'}, None, Generators())
+        bodies = [json.loads(template.render()) for _ in range(2)]
+        self.assertEqual([body['name'] for body in bodies], ['web-1', 'web-2'])
+        self.assertEqual(set(json.loads(template.render())['id'] for _ in range(50)), {'"a"', 'b'})
+
+    def test_unknown_and_escaped_generators(self):
+        template = Template({'text': 'hello {{name}}', 'id': '\\{{seq}}-{{seq}}'}, None,
+                            Generators())
+        self.assertEqual(json.loads(template.render()),
+                         {'text': 'hello {{name}}', 'id': '{{seq}}-1'})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import json
+from unittest import TestCase, main
+
+import requests
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from crest.tests.httpserver import serve
+from crest.timing import Timer, count, instrumented, phase
+
+
+class TimerTests(TestCase):
+
+    def test_phases(self):
+        with Timer() as timer:
+            with phase('body'):
+                pass
+            with phase('history'):
+                pass
+            with phase('body'):
+                pass
+        self.assertEqual(timer.phases.keys(), ['body', 'history'])
+        report = json.loads(timer.report('json'))
+        self.assertEqual(sorted(report), ['body', 'history', 'total'])
+        self.assertIn('other', timer.report())
+
+    def test_counts(self):
+        with Timer() as timer:
+            count('wire bytes', 10)
+        self.assertIn('wire bytes', timer.report())
+        self.assertEqual(json.loads(timer.report('json'))['wire bytes'], 10)
+
+    def test_inactive(self):
+        with phase('body'):
+            pass
+        with Timer() as timer:
+            pass
+        self.assertEqual(timer.phases, {})
+
+    def test_connection(self):
+        uri = serve(self)
+        session = requests.Session()
+        with Timer() as timer, instrumented(session):
+            r = session.get(uri + '/')
+        self.assertEqual(r.json(), {})
+        self.assertEqual(timer.phases.keys(), ['dns+connect', 'send request', 'wait'])
+        self.assertEqual(session.adapters['http://'].poolmanager.pool_classes_by_scheme['http'],
+                         HTTPConnectionPool)
+
+    def test_overlapping(self):
+        session = requests.Session()
+        manager = session.adapters['http://'].poolmanager
+        first, second = instrumented(session), instrumented(session)
+        first.__enter__()
+        second.__enter__()
+        first.__exit__(None, None, None)
+        self.assertNotEqual(manager.pool_classes_by_scheme['http'], HTTPConnectionPool)
+        second.__exit__(None, None, None)
+        self.assertEqual(manager.pool_classes_by_scheme['http'], HTTPConnectionPool)
+
+    def test_connection_error(self):
+        session = requests.Session()
+        with Timer(), instrumented(session):
+            with self.assertRaises(requests.ConnectionError) as cm:
+                session.get('http://127.0.0.1:1/')
+        self.assertIsInstance(cm.exception.args[0].reason, NewConnectionError)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import json
+from unittest import TestCase, main
+
+from requests import Response
+
+from crest.wait import Condition, wait
+
+
+def response(status, body=None, etag=None):
+    r = Response()
+    r.status_code = status
+    r._content = '' if body is None else json.dumps(body)
+    if etag:
+        r.headers['ETag'] = etag
+    return r
+
+
+class ConditionTests(TestCase):
+
+    def test_compare(self):
+        condition = Condition('group.activeCapacity >= 5')
+        self.assertTrue(condition.matches({'group': {'activeCapacity': 5}}))
+        self.assertFalse(condition.matches({'group': {'activeCapacity': 4}}))
+
+    def test_string(self):
+        self.assertTrue(Condition('servers[0].status==ACTIVE').matches(
+            {'servers': [{'status': 'ACTIVE'}]}))
+
+    def test_missing(self):
+        self.assertFalse(Condition('a.b == 1').matches({'a': {}}))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Condition, 'a.b')
+
+
+class WaitTests(TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.slept = []
+        self.sent = []
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+    def wait(self, first, responses, timeout=100):
+        responses = list(responses)
+
+        def get(headers):
+            self.sent.append(headers)
+            return responses.pop(0)
+
+        return wait(first, get, Condition('n >= 2'), timeout, sleep=self.sleep,
+                    clock=lambda: self.now)
+
+    def test_held(self):
+        last = response(200, {'n': 2})
+        r, polls, _ = self.wait(response(200, {'n': 0}, '"0"'),
+                                [response(304), response(200, {'n': 1}), last])
+        self.assertIs(r, last)
+        self.assertEqual(polls, 4)
+        self.assertEqual(self.sent[0], {'If-None-Match': '"0"'})
+        # Backs off while not changed and starts again when changed
+        self.assertTrue(1 <= self.slept[1] <= 2)
+        self.assertTrue(self.slept[2] <= 1)
+
+    def test_not_found_yet(self):
+        r, polls, _ = self.wait(response(404), [response(200, {'n': 3})])
+        self.assertEqual((r.json(), polls), ({'n': 3}, 2))
+        self.assertEqual(self.sent, [{}])
+
+    def test_timeout(self):
+        with self.assertRaises(SystemExit) as cm:
+            self.wait(response(200, {'n': 0}), [response(200, {'n': 0})] * 10, timeout=3)
+        self.assertIn('Last value: 0', str(cm.exception))
+        self.assertEqual(self.now, 3)
+
+
+if __name__ == '__main__':
+    main()
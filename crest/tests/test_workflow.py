@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+from unittest import TestCase, main
+
+from crest import cli
+from crest.cli import setup_parser
+from crest.workflow import load_steps, run_workflow, step_args
+
+
+def steps(**steps):
+    return {'steps': steps}
+
+
+class LoadStepsTests(TestCase):
+
+    def test_order(self):
+        loaded = load_steps(steps(
+            hook={'args': 'p/${policy.id}/webhooks -m post'},
+            policy={'args': 'g/${group.id}/policies', 'outputs': {'id': 'policies[0].id'}},
+            group={'args': 'groups -m post', 'outputs': {'id': 'group.id'}},
+            other={'args': 'other', 'after': ['group']}))
+        self.assertEqual([step.name for step in loaded], ['group', 'other', 'policy', 'hook'])
+        self.assertEqual(loaded[3].after, {'policy'})
+
+    def test_unknown_output(self):
+        self.assertRaises(ValueError, load_steps, steps(a={'args': 'a'}, b={'args': '${a.id}'}))
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError) as cm:
+            load_steps(steps(a={'args': 'a', 'after': ['b']}, b={'args': 'b', 'after': ['a']}))
+        self.assertIn('a, b', str(cm.exception))
+
+
+class StepArgsTests(TestCase):
+
+    def test_substitute(self):
+        loaded = {step.name: step for step in load_steps(steps(
+            group={'args': 'g', 'outputs': {'id': 'id', 'min': 'min'}},
+            hook={'args': 'g/${group.id} -r "name=a b" -r min=${group.min}'}))}
+        loaded['group'].values = {'id': 'a b', 'min': 2}
+        self.assertEqual(step_args(loaded['hook'], loaded),
+                         ['g/a b', '-r', 'name=a b', '-r', 'min=2'])
+
+
+class RunWorkflowTests(TestCase):
+
+    def run_workflow(self, config):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        # History of steps goes to temporary directory
+        self.addCleanup(setattr, cli, 'home', cli.home)
+        cli.home = tmp
+        path = os.path.join(tmp, 'workflow.py')
+        with open(path, 'w') as f:
+            f.write('config = {!r}'.format(config))
+        out = StringIO()
+        failures = run_workflow(setup_parser(), path, out=out)
+        return failures, [line.split()[:2] for line in out.getvalue().splitlines()]
+
+    def test_empty(self):
+        failures, lines = self.run_workflow(steps())
+        self.assertEqual(failures, 0)
+        self.assertEqual(lines, [['0', 'steps']])
+
+    def test_failed_before_skipped(self):
+        failures, lines = self.run_workflow(steps(
+            a={'args': 'http://127.0.0.1:1/a', 'outputs': {'id': 'id'}},
+            b={'args': 'http://127.0.0.1:1/b/${a.id}'},
+            c={'args': 'http://127.0.0.1:1/c', 'after': ['b']}))
+        self.assertEqual(failures, 3)
+        self.assertEqual(lines[:3], [['a', 'failed'], ['b', 'skipped'], ['c', 'skipped']])
+
+    def test_malformed_args(self):
+        failures, lines = self.run_workflow(steps(
+            a={'args': 'http://127.0.0.1:1/a -r "name=x'},
+            b={'args': 'http://127.0.0.1:1/b', 'after': ['a']}))
+        self.assertEqual(failures, 2)
+        self.assertEqual(lines[:2], [['a', 'failed'], ['b', 'skipped']])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Time taken by phases of a crest invocation, reported by --timing.
+
+Code marks its phases with `phase` which does nothing unless a `Timer` is active in the
+thread. Connections made by a session while it is `instrumented` also record time taken by
+DNS lookup with TCP connect, TLS handshake, sending request and waiting for response headers.
+Sizes like bytes received are reported along with the phases when given to `count`.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+_local = threading.local()
+
+
+class Timer(object):
+    """
+    Total seconds of each phase in order they first occurred. Active in current thread
+    while used as context manager
+    """
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        self.counts = OrderedDict()
+        self.total = None
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0) + seconds
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'timer', None)
+        _local.timer = self
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.total = time.time() - self._start
+        _local.timer = self._previous
+
+    def as_dict(self):
+        """
+        Milliseconds of each phase and total
+        """
+        d = OrderedDict((name, round(seconds * 1000, 3)) for name, seconds in self.phases.items())
+        d['total'] = round(self.total * 1000, 3)
+        return d
+
+    def report(self, fmt='table'):
+        d = self.as_dict()
+        if fmt == 'json':
+            d.update(self.counts)
+            return json.dumps(d)
+        other = d['total'] - sum(ms for name, ms in d.items() if name != 'total')
+        rows = d.items()[:-1] + [('other', other), ('total', d['total'])]
+        return '\n'.join(['{:<16}{:>10.3f} ms'.format(name, ms) for name, ms in rows] +
+                         ['{:<16}{:>10}'.format(name, value) for name, value in self.counts.items()])
+
+
+def record(name, seconds):
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def count(name, value):
+    """
+    Report `value` of `name` like a size if a `Timer` is active
+    """
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.counts[name] = value
+
+
+@contextmanager
+def phase(name):
+    """
+    Record time taken by the block as phase `name` if a `Timer` is active
+    """
+    if getattr(_local, 'timer', None) is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        record(name, time.time() - start)
+
+
+def _connection_classes():
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+
+    class TimedConnection(object):
+
+        def _new_conn(self):
+            # urllib3 resolves and connects in one call trying each address
+            with phase('dns+connect'):
+                sock = super(TimedConnection, self)._new_conn()
+            self._connected_at = time.time()
+            return sock
+
+        def request(self, *args, **kwargs):
+            with phase('send request'):
+                return super(TimedConnection, self).request(*args, **kwargs)
+
+        def getresponse(self, *args, **kwargs):
+            # Time taken by server to process the request and send response headers
+            with phase('wait'):
+                return super(TimedConnection, self).getresponse(*args, **kwargs)
+
+    class TimedHTTPConnection(TimedConnection, HTTPConnection):
+        pass
+
+    class TimedHTTPSConnection(TimedConnection, HTTPSConnection):
+
+        def connect(self):
+            super(TimedHTTPSConnection, self).connect()
+            record('tls', time.time() - self._connected_at)
+
+    return TimedHTTPConnection, TimedHTTPSConnection
+
+
+_pool_classes = None
+
+# Pool managers instrumented by threads: manager -> [number of threads, original classes]
+_instrumented = {}
+_instrumented_lock = threading.Lock()
+
+
+@contextmanager
+def instrumented(session):
+    """
+    Make connections `session` opens in the block record their phases. Threads sharing the
+    session can be in the block at the same time: original pool classes are restored when
+    the last of them leaves it
+    """
+    global _pool_classes
+    with _instrumented_lock:
+        if _pool_classes is None:
+            from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+            http, https = _connection_classes()
+            _pool_classes = {
+                'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,),
+                             {'ConnectionCls': http}),
+                'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,),
+                              {'ConnectionCls': https})
+            }
+        managers = set(adapter.poolmanager for adapter in session.adapters.values())
+        for manager in managers:
+            if manager in _instrumented:
+                _instrumented[manager][0] += 1
+            else:
+                _instrumented[manager] = [1, manager.pool_classes_by_scheme]
+                manager.pool_classes_by_scheme = _pool_classes
+    try:
+        yield
+    finally:
+        # Pools made in the block stay timed but record nothing without an active Timer
+        with _instrumented_lock:
+            for manager in managers:
+                entry = _instrumented[manager]
+                entry[0] -= 1
+                if not entry[0]:
+                    manager.pool_classes_by_scheme = entry[1]
+                    del _instrumented[manager]
+
+
+def count_response(r):
+    """
+    Make response `r` report bytes of its body received on wire and after decoding
+    them as per Content-Encoding once the body is read
+    """
+    iter_content = r.iter_content
+
+    def counted(*args, **kwargs):
+        decoded = 0
+        try:
+            for chunk in iter_content(*args, **kwargs):
+                decoded += len(chunk)
+                yield chunk
+        finally:
+            if hasattr(r.raw, 'tell'):
+                count('wire bytes', r.raw.tell())
+            count('decoded bytes', decoded)
+
+    r.iter_content = counted
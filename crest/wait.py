@@ -0,0 +1,90 @@
+"""
+Poll a resource till a condition on its JSON body holds.
+
+Polls back off exponentially with jitter while response does not change and start again
+from initial interval when it changes. Repeat polls send If-None-Match with ETag of last
+response so that unchanged body is neither sent again nor decoded.
+"""
+
+import json
+import operator
+import random
+import re
+import time
+
+from bodypart import compile_body_part
+
+
+_condition_re = re.compile(r'^\s*(\S+?)\s*(==|!=|<=|>=|<|>)\s*(.*?)\s*$')
+
+_operators = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+              '>': operator.gt, '>=': operator.ge}
+
+# Longest seconds between polls
+max_interval = 30
+
+
+class Condition(object):
+    """
+    Condition like ``group.activeCapacity >= 5`` on a body part. Value is taken as JSON
+    if it is valid JSON or as string otherwise
+    """
+
+    def __init__(self, text):
+        match = _condition_re.match(text)
+        if not match:
+            raise ValueError('Invalid condition {!r}. Expected "body part op value"'.format(text))
+        name, op, value = match.groups()
+        self.text = text
+        self.part = compile_body_part(name)
+        self.op = _operators[op]
+        try:
+            self.value = json.loads(value)
+        except ValueError:
+            self.value = value
+
+    def value_of(self, body):
+        try:
+            return self.part.get(body)
+        except (KeyError, IndexError, TypeError):
+            return None
+
+    def matches(self, body):
+        return body is not None and self.op(self.value_of(body), self.value)
+
+
+def _body(r):
+    if r.status_code // 100 != 2:
+        return None
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+
+def wait(r, get, condition, timeout, interval=1, sleep=time.sleep, clock=time.time):
+    """
+    Poll till `condition` holds on body of latest response starting with response `r`. `get`
+    takes headers to add and returns a new response. Returns (response, polls, seconds elapsed).
+    Raises SystemExit if condition does not hold within `timeout` seconds
+    """
+    start = clock()
+    polls, delay = 1, interval
+    body = _body(r)
+    while not condition.matches(body):
+        remaining = start + timeout - clock()
+        if remaining <= 0:
+            raise SystemExit('Error: "{}" did not hold after {} polls in {:.1f}s. Last value: {}'.format(
+                condition.text, polls, clock() - start, json.dumps(condition.value_of(body))))
+        sleep(min(random.uniform(delay / 2.0, delay), remaining))
+        etag = r.headers.get('etag')
+        latest = get({'If-None-Match': etag} if etag and body is not None else {})
+        polls += 1
+        if latest.status_code == 304:
+            # Not changed
+            delay = min(delay * 2, max_interval)
+            continue
+        latest_body = _body(latest)
+        delay = min(delay * 2, max_interval) if latest_body == body else interval
+        r, body = latest, latest_body
+    return r, polls, clock() - start
@@ -0,0 +1,172 @@
+"""
+Run workflow of requests depending on values from responses of earlier requests.
+
+Workflow file is a python file like service config whose ``config`` has "steps": a dict of
+step name to step. A step has "args": crest arguments as string, "outputs": dict of name to
+JSON body part of its response and optionally "after": list of steps it runs after.
+``${step.name}`` in args of a step is replaced by output `name` of `step`, which makes it run
+after `step`. Steps run as soon as steps they depend on succeed, independent steps concurrently
+over one session. Steps depending on a failed step are skipped.
+"""
+
+from __future__ import print_function
+
+import json
+import re
+import shlex
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+from Queue import Queue
+
+import requests
+
+from bodypart import compile_body_part
+from cli import check_status
+from engine import run_request
+from registry import extract_config_from_file
+
+
+_reference_re = re.compile(r'\$\{(\w+)\.(\w+)\}')
+
+
+class Step(object):
+    """
+    Step `name` of workflow and its result once it is run
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        self.args = config['args']
+        self.outputs = config.get('outputs', {})
+        self.references = set(_reference_re.findall(self.args))
+        self.after = set(config.get('after', [])) | set(step for step, _ in self.references)
+        self.state = 'pending'
+        self.status = None
+        self.latency = None
+        self.values = {}
+        self.error = None
+
+
+def load_steps(config):
+    """
+    Steps of workflow `config` in order they can be run. Raises ValueError if a step refers
+    to unknown step or output or steps depend on each other
+    """
+    steps = {name: Step(name, step) for name, step in config['steps'].items()}
+    for step in steps.values():
+        for name in step.after:
+            if name not in steps:
+                raise ValueError('Step {} refers to unknown step {}'.format(step.name, name))
+        for name, output in step.references:
+            if output not in steps[name].outputs:
+                raise ValueError('Step {} refers to unknown output {}.{}'.format(
+                    step.name, name, output))
+    ordered, done = [], set()
+    while len(ordered) < len(steps):
+        ready = sorted(name for name, step in steps.items()
+                       if name not in done and step.after <= done)
+        if not ready:
+            raise ValueError('Steps depend on each other: {}'.format(
+                ', '.join(sorted(set(steps) - done))))
+        ordered.extend(steps[name] for name in ready)
+        done.update(ready)
+    return ordered
+
+
+def step_args(step, steps):
+    """
+    Arguments of `step` with references replaced by outputs of `steps`
+    """
+
+    def value(match):
+        value = steps[match.group(1)].values[match.group(2)]
+        return value if isinstance(value, basestring) else json.dumps(value)
+
+    return [_reference_re.sub(value, arg) for arg in shlex.split(step.args)]
+
+
+def run_step(parser, session, step, steps, rate_limit=None):
+    """
+    Send request of `step` and take its outputs from the response
+    """
+
+    def handle(r, args):
+        check_status(r, None)
+        body = r.json() if step.outputs else None
+        return {name: compile_body_part(part).get(body) for name, part in step.outputs.items()}
+
+    try:
+        argv = step_args(step, steps)
+    except Exception as e:
+        # Raising would lose the step in worker thread and leave the workflow waiting for it
+        step.state, step.latency = 'failed', 0
+        step.error = 'Error: Invalid args - {}'.format(e)
+        return step
+    result = run_request(argv, session, handle, parser, {'rate_limit': rate_limit})
+    step.status, step.latency, step.error = result.status, result.latency, result.error
+    if result.error is None and result.status is None:
+        # Arguments like --print-only do not send the request
+        step.error = 'No response'
+    step.values = result.value or {}
+    step.state = 'failed' if step.error else 'succeeded'
+    return step
+
+
+def print_step(step, out):
+    values = ' '.join('{}={}'.format(name, value) for name, value in sorted(step.values.items()))
+    print('{:<20}{:<10}{:<6}{:>10}  {}'.format(
+        step.name, step.state, step.status or '-',
+        '-' if step.latency is None else '{:.1f} ms'.format(step.latency * 1000),
+        step.error.replace('\n', ' ') if step.error else values), file=out)
+    out.flush()
+
+
+def run_workflow(parser, path, concurrency=None, rate_limit=None, session=None,
+                 out=sys.stdout):
+    """
+    Run steps of workflow in file `path` with upto `concurrency` (defaults to number of
+    steps) steps at a time. Prints each step as it completes and summary at the end.
+    Returns number of steps that did not succeed
+    """
+    try:
+        steps = load_steps(extract_config_from_file(path))
+    except (IOError, KeyError, ValueError) as e:
+        raise SystemExit('Error: Invalid workflow {} - {}'.format(path, e))
+    by_name = {step.name: step for step in steps}
+    session = session or requests.Session()
+    pool = ThreadPool(concurrency or len(steps) or 1)
+    completed = Queue()
+    start = time.time()
+    # States as seen by this thread: workers change those of steps before they are
+    # taken from `completed`
+    states = {step.name: 'pending' for step in steps}
+    running = 0
+    try:
+        while True:
+            for step in steps:
+                if states[step.name] != 'pending':
+                    continue
+                after = set(states[name] for name in step.after)
+                if after & {'failed', 'skipped'}:
+                    step.state = states[step.name] = 'skipped'
+                    print_step(step, out)
+                elif after <= {'succeeded'}:
+                    states[step.name] = 'running'
+                    running += 1
+                    pool.apply_async(run_step, (parser, session, step, by_name, rate_limit),
+                                     callback=completed.put)
+            if not running:
+                break
+            # Timeout keeps main thread interruptible
+            step = completed.get(timeout=1e9)
+            states[step.name] = step.state
+            print_step(step, out)
+            running -= 1
+    finally:
+        pool.terminate()
+    counts = {state: sum(step.state == state for step in steps)
+              for state in ('succeeded', 'failed', 'skipped')}
+    print('{} steps in {:.2f}s: {succeeded} succeeded, {failed} failed, {skipped} skipped'.format(
+        len(steps), time.time() - start, **counts), file=out)
+    return counts['failed'] + counts['skipped']
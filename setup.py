@@ -18,7 +18,7 @@ setup(name=package_name,
       maintainer='Manish Tomar',
       maintainer_email='manish.tomar@gmail.com',
 
-      entry_points={'console_scripts': ['crest = crest.cli:main']},
+      entry_points={'console_scripts': ['crest = crest.client:main']},
 
       license='MIT',
       keywords="restful cli",
@@ -34,6 +34,6 @@ setup(name=package_name,
           "Topic :: Internet :: WWW/HTTP"
       ],
 
-      packages=find_packages(),
+      packages=find_packages(exclude=['benchmarks']),
       install_requires=['requests']
       )